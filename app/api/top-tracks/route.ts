@@ -15,13 +15,15 @@ export async function GET(request: NextRequest) {
         ROUND(SUM(p.ms_played) / 1000.0 / 60.0 / 60.0, 2) AS hours,
         COUNT(*) AS plays,
         t.spotify_track_uri,
-        t.album_image_url
+        -- Tracks enriched before the albums table keep their own album_image_url
+        COALESCE(al.image_url, t.album_image_url) AS album_image_url
       FROM plays p
       LEFT JOIN tracks t ON p.spotify_track_uri = t.spotify_track_uri
+      LEFT JOIN albums al ON t.spotify_album_id = al.spotify_album_id
       WHERE 1=1
         ${startDate ? `AND p.date >= ?::date` : ''}
         ${endDate ? `AND p.date <= ?::date` : ''}
-      GROUP BY p.track_name, p.artist_name, t.spotify_track_uri, t.album_image_url
+      GROUP BY p.track_name, p.artist_name, t.spotify_track_uri, al.image_url, t.album_image_url
       ORDER BY hours DESC
       LIMIT ?
     `
@@ -0,0 +1,178 @@
+"""
+Persistent cache of Spotify API responses shared by the enrichment scripts.
+
+Every track/artist/album object fetched from the API is stored under a key
+derived from endpoint + Spotify ID, so a re-run after a crash or a schema
+change (e.g. a new column derived from the track payload) reads the objects
+back from disk instead of refetching them.
+
+Entries live in one SQLite file (data/api_cache.sqlite3) as zlib-compressed
+JSON. Entries older than the TTL count as misses; prune() drops them and
+then evicts least recently used entries until the cache fits its size cap.
+Objects the API returned as null (unknown IDs) are not cached, so they are
+retried on the next run.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+CACHE_PATH = DATA_DIR / "api_cache.sqlite3"
+
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_MB = 512
+
+
+def cache_key(endpoint, spotify_id):
+    return hashlib.sha256(f"{endpoint}:{spotify_id}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """Endpoint + ID keyed store of API objects with TTL and size-capped LRU eviction."""
+
+    def __init__(self, path=None, ttl_days=DEFAULT_TTL_DAYS, max_mb=DEFAULT_MAX_MB):
+        self.path = Path(path or CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_bytes = max_mb * 1024 * 1024
+        self.con = sqlite3.connect(str(self.path))
+        self.con.execute("PRAGMA journal_mode = WAL")
+        self.con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,        -- sha256 of endpoint:id
+                endpoint TEXT NOT NULL,
+                spotify_id TEXT NOT NULL,
+                payload BLOB NOT NULL,       -- zlib-compressed JSON object
+                size_bytes INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """
+        )
+        self.con.execute("CREATE INDEX IF NOT EXISTS idx_responses_endpoint ON responses(endpoint)")
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, endpoint, spotify_ids):
+        """
+        Return ({id: object} for fresh cached IDs, [IDs still to fetch]),
+        preserving the order of `spotify_ids` in the missing list.
+        """
+        keys = {cache_key(endpoint, spotify_id): spotify_id for spotify_id in spotify_ids}
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        rows = self.con.execute(
+            f"SELECT key, payload FROM responses WHERE key IN ({placeholders}) AND fetched_at >= ?",
+            [*keys, now - self.ttl_seconds],
+        ).fetchall()
+        found = {keys[key]: json.loads(zlib.decompress(payload)) for key, payload in rows}
+        if rows:
+            self.con.execute(
+                f"UPDATE responses SET accessed_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                [now, *(key for key, _ in rows)],
+            )
+            self.con.commit()
+        missing = [spotify_id for spotify_id in spotify_ids if spotify_id not in found]
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def store(self, endpoint, spotify_ids, objects):
+        """Cache API objects under the IDs they were requested with (nulls are skipped)."""
+        now = time.time()
+        rows = []
+        for spotify_id, obj in zip(spotify_ids, objects):
+            if obj is None:
+                continue
+            payload = zlib.compress(json.dumps(obj, separators=(",", ":")).encode())
+            rows.append((cache_key(endpoint, spotify_id), endpoint, spotify_id, payload, len(payload), now, now))
+        self.con.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.con.commit()
+
+    def prune(self):
+        """Drop expired entries, then evict least recently used ones above the size cap."""
+        expired = self.con.execute(
+            "DELETE FROM responses WHERE fetched_at < ?", [time.time() - self.ttl_seconds]
+        ).rowcount
+        evicted = self.con.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size_bytes) OVER (ORDER BY accessed_at DESC, key) AS kept_bytes
+                    FROM responses
+                ) WHERE kept_bytes > ?
+            )
+        """,
+            [self.max_bytes],
+        ).rowcount
+        self.con.commit()
+        return expired, evicted
+
+    def size_mb(self):
+        total = self.con.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM responses").fetchone()[0]
+        return total / 1024 / 1024
+
+    def close(self):
+        self.con.close()
+
+
+class CachedSpotify:
+    """
+    Wraps a spotipy client so tracks()/artists()/albums()/audio_features()
+    only request IDs missing from the cache. Responses keep spotipy's shape, in
+    request order. Other attributes pass through to the wrapped client.
+    """
+
+    def __init__(self, sp, cache):
+        self.sp = sp
+        self.cache = cache
+
+    def _batch(self, endpoint, spotify_ids, fetch):
+        found, missing = self.cache.lookup(endpoint, spotify_ids)
+        if missing:
+            fetched = fetch(missing)[endpoint]
+            self.cache.store(endpoint, missing, fetched)
+            found.update(zip(missing, fetched))
+        return {endpoint: [found.get(spotify_id) for spotify_id in spotify_ids]}
+
+    def tracks(self, track_ids):
+        return self._batch("tracks", track_ids, self.sp.tracks)
+
+    def artists(self, artist_ids):
+        return self._batch("artists", artist_ids, self.sp.artists)
+
+    def albums(self, album_ids):
+        return self._batch("albums", album_ids, self.sp.albums)
+
+    def audio_features(self, track_ids):
+        # spotipy returns a bare list here, not {"audio_features": [...]}
+        def fetch(missing):
+            return {"audio_features": self.sp.audio_features(missing)}
+
+        return self._batch("audio_features", track_ids, fetch)["audio_features"]
+
+    def __getattr__(self, name):
+        return getattr(self.sp, name)
+
+
+class AsyncCachedSpotify(CachedSpotify):
+    """CachedSpotify for an AsyncSpotify client (awaitable tracks()/artists()/audio_features())."""
+
+    async def _batch(self, endpoint, spotify_ids, fetch):
+        found, missing = self.cache.lookup(endpoint, spotify_ids)
+        if missing:
+            fetched = (await fetch(missing))[endpoint]
+            self.cache.store(endpoint, missing, fetched)
+            found.update(zip(missing, fetched))
+        return {endpoint: [found.get(spotify_id) for spotify_id in spotify_ids]}
+
+    async def audio_features(self, track_ids):
+        async def fetch(missing):
+            return {"audio_features": await self.sp.audio_features(missing)}
+
+        return (await self._batch("audio_features", track_ids, fetch))["audio_features"]
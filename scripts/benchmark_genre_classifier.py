@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Check and benchmark the compiled genre classifier against the original if-chain.
+
+seed_genre_mappings.categorize_genre used to test each keyword of each rule
+with a separate substring search; it now scans the genre once with an
+Aho–Corasick automaton built from GENRE_RULES. This script keeps the
+original function as a reference and:
+
+  - checks both return the same (broad_genre, confidence) for every genre in
+    the database (artists.genres and genre_mappings), every synthetic genre,
+    every rule keyword on its own, and random keyword combinations
+  - times both over the same genre list
+
+Exits non-zero on any mismatch.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+
+from generate_synthetic_history import GENRES
+from seed_genre_mappings import DB_PATH, GENRE_RULES, categorize_genre
+
+
+def reference_categorize_genre(genre: str) -> tuple[str, str]:
+    """The original if-chain classifier, kept verbatim as the reference."""
+    g = genre.lower()
+
+    # Metal (check first - very specific)
+    if "metal" in g or "deathcore" in g or "djent" in g:
+        return ("Metal", "high")
+
+    # Rock and subgenres
+    if any(
+        x in g
+        for x in [
+            "rock",
+            "grunge",
+            "britpop",
+            "shoegaze",
+            "madchester",
+            "aor",
+            "new wave",
+            "jam band",
+            "southern gothic",
+            "neo-psychedelic",
+        ]
+    ):
+        return ("Rock", "high")
+
+    # Hip Hop / Rap
+    if any(
+        x in g
+        for x in [
+            "hip hop",
+            "rap",
+            "trap",
+            "drill",
+            "boom bap",
+            "crunk",
+            "g-funk",
+            "horrorcore",
+            "freestyle",
+        ]
+    ):
+        return ("Hip Hop/Rap", "high")
+
+    # Electronic / Dance
+    if any(
+        x in g
+        for x in [
+            "house",
+            "techno",
+            "trance",
+            "edm",
+            "electronic",
+            "electronica",
+            "drum and bass",
+            "dubstep",
+            "ambient",
+            "downtempo",
+            "idm",
+            "breakbeat",
+            "garage",
+            "bass",
+            "hardstyle",
+            "hardcore",
+            "eurodance",
+            "future bass",
+            "synthwave",
+            "vaporwave",
+            "chillwave",
+            "nightcore",
+            "trip hop",
+            "big beat",
+            "big room",
+            "electro",
+            "electroacoustic",
+            "electroclash",
+            "chillstep",
+            "darkwave",
+            "hi-nrg",
+            "new rave",
+            "moombahton",
+            "frenchcore",
+        ]
+    ):
+        # Exception: jazz house, jazz fusion house go to Jazz
+        if "jazz" in g and "house" in g:
+            return ("Jazz", "medium")
+        return ("Electronic/Dance", "high")
+
+    # Jazz
+    if "jazz" in g or "bop" in g:
+        return ("Jazz", "high")
+
+    # Blues
+    if ("blues" in g and "rock" not in g) or "boogie-woogie" in g:
+        return ("Blues", "high")
+
+    # Soul / R&B
+    if any(
+        x in g for x in ["soul", "r&b", "r & b", "motown", "philly soul", "doo-wop"]
+    ):
+        return ("Soul/R&B", "high")
+
+    # Funk
+    if "funk" in g and "house" not in g:
+        return ("Funk", "high")
+
+    # Folk / Americana / Singer-Songwriter
+    if any(
+        x in g
+        for x in [
+            "folk",
+            "americana",
+            "singer-songwriter",
+            "bluegrass",
+            "roots",
+            "anti-folk",
+            "neofolk",
+            "newgrass",
+            "sea shanties",
+            "cajun",
+            "zydeco",
+        ]
+    ):
+        return ("Folk/Americana", "high")
+
+    # Country
+    if "country" in g or "honky tonk" in g or "tejano" in g or "red dirt" in g:
+        return ("Country", "high")
+
+    # Indie / Alternative
+    if any(
+        x in g for x in ["indie", "alternative", "bedroom", "lo-fi", "lofi", "slowcore"]
+    ):
+        # Exceptions
+        if "folk" in g:
+            return ("Folk/Americana", "high")
+        if "electronic" in g or "house" in g:
+            return ("Electronic/Dance", "high")
+        return ("Indie/Alternative", "high")
+
+    # Pop
+    if "pop" in g or "chanson" in g or "variété" in g or "schlager" in g:
+        # Exceptions for specific pop subgenres
+        if any(
+            x in g for x in ["k-pop", "j-pop", "hyperpop", "synthpop", "electropop"]
+        ):
+            return ("Pop", "high")
+        if "indie" in g:
+            return ("Indie/Alternative", "high")
+        if "folk" in g:
+            return ("Folk/Americana", "high")
+        if "country" in g:
+            return ("Country", "high")
+        return ("Pop", "high")
+
+    # Reggae / Caribbean
+    if any(
+        x in g
+        for x in [
+            "reggae",
+            "ska",
+            "dancehall",
+            "dub",
+            "ragga",
+            "rocksteady",
+            "calypso",
+            "soca",
+            "reggaeton",
+        ]
+    ):
+        return ("Reggae/Caribbean", "high")
+
+    # Latin
+    if any(
+        x in g
+        for x in [
+            "latin",
+            "salsa",
+            "bachata",
+            "merengue",
+            "cumbia",
+            "mariachi",
+            "tango",
+            "bossa nova",
+            "samba",
+            "mpb",
+            "pagode",
+            "trova",
+            "vallenato",
+            "urbano",
+            "corridos",
+            "bolero",
+            "cha cha cha",
+            "candombe",
+            "parang",
+            "techengue",
+        ]
+    ):
+        return ("Latin", "high")
+
+    # Classical / Orchestral
+    if any(
+        x in g
+        for x in [
+            "classical",
+            "baroque",
+            "opera",
+            "symphony",
+            "orchestral",
+            "concerto",
+            "chamber",
+            "renaissance",
+            "medieval",
+            "choral",
+            "gregorian",
+            "impressionism",
+            "expressionism",
+            "minimalism",
+            "early music",
+            "ballet",
+        ]
+    ):
+        return ("Classical", "high")
+
+    # World Music
+    if any(
+        x in g
+        for x in [
+            "african",
+            "afro",
+            "celtic",
+            "indian",
+            "bollywood",
+            "bhangra",
+            "flamenco",
+            "fado",
+            "klezmer",
+            "world",
+            "ethnic",
+            "traditional",
+            "native",
+            "aboriginal",
+            "balkan",
+            "turkish",
+            "arabic",
+            "persian",
+            "chinese",
+            "japanese",
+            "korean",
+            "thai",
+            "vietnamese",
+            "indonesian",
+            "moroccan",
+            "egyptian",
+            "ethiopian",
+            "gnawa",
+            "kollywood",
+            "tollywood",
+            "desi",
+            "punjabi",
+            "tamil",
+            "telugu",
+            "hindi",
+            "opm",
+            "pinoy",
+            "harana",
+            "kundiman",
+            "taiwanese",
+            "gengetone",
+            "highlife",
+            "afrobeat",
+            "afrobeats",
+            "afropop",
+            "raï",
+            "chaabi",
+            "enka",
+            "kayokyoku",
+            "shibuya-kei",
+            "mizrahi",
+        ]
+    ):
+        return ("World", "high")
+
+    # Gospel / Christian / Worship
+    if any(
+        x in g
+        for x in [
+            "gospel",
+            "christian",
+            "worship",
+            "ccm",
+            "catholic",
+            "devotional",
+            "bhajan",
+        ]
+    ):
+        return ("Gospel/Christian", "high")
+
+    # Holiday / Seasonal
+    if any(x in g for x in ["christmas", "holiday", "villancicos"]):
+        return ("Holiday", "high")
+
+    # Punk
+    if ("punk" in g and "funk" not in g) or "riot grrrl" in g or "queercore" in g:
+        return ("Punk", "high")
+
+    # Disco
+    if "disco" in g:
+        return ("Disco", "high")
+
+    # Funk (second check for pure funk)
+    if "funk" in g:
+        return ("Funk", "high")
+
+    # Jazz (catch remaining jazz-like genres)
+    if any(x in g for x in ["swing", "big band", "bebop", "ragtime", "brass band"]):
+        return ("Jazz", "medium")
+
+    # Soundtracks / Instrumental
+    if any(
+        x in g
+        for x in [
+            "soundtrack",
+            "score",
+            "instrumental",
+            "musicals",
+            "anime",
+            "video game",
+        ]
+    ):
+        return ("Soundtrack/Score", "high")
+
+    # Spoken Word / Comedy
+    if any(x in g for x in ["spoken word", "comedy", "audiobook", "podcast"]):
+        return ("Spoken Word/Comedy", "high")
+
+    # Children's / Lullaby
+    if any(x in g for x in ["children's", "lullaby", "nursery"]):
+        return ("Children's", "high")
+
+    # Experimental / Avant-Garde
+    if any(
+        x in g
+        for x in [
+            "experimental",
+            "avant-garde",
+            "noise",
+            "industrial",
+            "musique concrète",
+            "plunderphonics",
+            "drone",
+        ]
+    ):
+        return ("Experimental", "high")
+
+    # Easy Listening / Lounge
+    if any(
+        x in g
+        for x in [
+            "easy listening",
+            "lounge",
+            "exotica",
+            "yacht rock",
+            "adult standards",
+            "quiet storm",
+            "smooth",
+        ]
+    ):
+        return ("Easy Listening", "medium")
+
+    # Emo / Screamo
+    if "emo" in g or "screamo" in g:
+        return ("Emo/Screamo", "high")
+
+    # New Age
+    if any(x in g for x in ["new age", "meditation", "ambient", "space music"]):
+        return ("New Age", "medium")
+
+    # If nothing matches, return Other
+    return ("Other", "low")
+
+
+def database_genres(db_path):
+    """Distinct genres in artists.genres and genre_mappings (empty if the database is missing)."""
+    if not db_path.exists():
+        return set()
+    con = duckdb.connect(str(db_path), read_only=True)
+    tables = {row[0] for row in con.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+    genres = set()
+    if "artists" in tables:
+        genres.update(
+            row[0]
+            for row in con.execute(
+                "SELECT DISTINCT TRIM(UNNEST(STRING_SPLIT(genres, ','))) FROM artists WHERE genres IS NOT NULL"
+            ).fetchall()
+        )
+    if "genre_mappings" in tables:
+        genres.update(row[0] for row in con.execute("SELECT subgenre FROM genre_mappings").fetchall())
+    con.close()
+    return genres
+
+
+def keyword_combinations(count, seed):
+    """Genres built from 1-3 rule keywords, so every rule, exception and `unless` gets exercised."""
+    keywords = sorted(
+        {keyword for _, _, words, _, _ in GENRE_RULES for keyword in words}
+        | {keyword for _, _, _, unless, _ in GENRE_RULES for keyword in unless}
+        | {keyword for _, _, _, _, exceptions in GENRE_RULES for required, _ in exceptions for keyword in required}
+    )
+    rng = random.Random(seed)
+    genres = set(keywords) | {keyword.upper() for keyword in keywords}
+    while len(genres) < count + 2 * len(keywords):
+        words = rng.sample(keywords, rng.randint(2, 3))
+        genres.add(rng.choice([" ", "-", ""]).join(words))
+    return genres
+
+
+def time_classifier(classify, genres, repeat):
+    """Median microseconds per genre over `repeat` passes."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for genre in genres:
+            classify(genre)
+        timings.append((time.perf_counter() - start) / len(genres) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="DuckDB file to read genres from")
+    parser.add_argument("--combinations", type=int, default=20000, help="Random keyword combinations to check")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes per classifier (median reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    known = database_genres(args.db) | set(GENRES)
+    genres = sorted(known | keyword_combinations(args.combinations, args.seed))
+    print(f"Checking {len(genres):,} genres ({len(known):,} from the database and synthetic history)...")
+
+    mismatches = [
+        (genre, expected, actual)
+        for genre in genres
+        if (expected := reference_categorize_genre(genre)) != (actual := categorize_genre(genre))
+    ]
+    for genre, expected, actual in mismatches[:20]:
+        print(f"  ❌ {genre!r}: if-chain {expected}, compiled {actual}")
+    if mismatches:
+        print(f"{len(mismatches):,} mismatches")
+        sys.exit(1)
+    print("  ✓ identical results")
+
+    print(f"\nTiming, median of {args.repeat} passes:")
+    for label, sample in (("known genres", sorted(known)), ("all checked genres", genres)):
+        before = time_classifier(reference_categorize_genre, sample, args.repeat)
+        after = time_classifier(categorize_genre, sample, args.repeat)
+        print(f"  {label:<20} if-chain {before:6.2f} µs/genre   compiled {after:6.2f} µs/genre   ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
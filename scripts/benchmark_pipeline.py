@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark the data pipeline on synthetic histories of increasing size.
+
+For each --sizes entry, generates a synthetic export with
+generate_synthetic_history.py (cached between runs), then runs each pipeline
+stage as its own process against a scratch database:
+
+  ingest              ingest_spotify.py full rebuild
+  ingest_incremental  ingest_spotify.py --incremental with nothing new
+  seed_genres         seed_genre_mappings.py (artists loaded from the
+                      generator's synthetic_artists.csv)
+  sync                sync_to_postgres.py, only if BENCHMARK_POSTGRES_URL is
+                      set (it drops and recreates every table there, so never
+                      point it at the production database)
+
+Wall time, CPU time, peak RSS and database size are recorded per stage and
+appended to a JSON results file so runs can be compared over time.
+
+Usage:
+    python scripts/benchmark_pipeline.py --sizes 100000,1000000
+    python scripts/benchmark_pipeline.py --sizes 1000000 --engine sql
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+
+SCRIPTS_DIR = Path(__file__).parent
+DATA_DIR = SCRIPTS_DIR.parent / "data"
+WORK_DIR = DATA_DIR / "benchmark"
+RESULTS_PATH = DATA_DIR / "benchmark_results.json"
+
+
+def run_stage(name, command, log_path, env=None):
+    """
+    Run one stage to completion and return its resource usage.
+
+    os.wait4() gives the child's own rusage, so peak RSS is the stage's and
+    not the benchmark driver's.
+    """
+    print(f"  {name:<20}", end="", flush=True)
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - start
+    # Already reaped by wait4; tell Popen so it does not try again
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    if proc.returncode != 0:
+        print("FAILED")
+        print(log_path.read_text()[-2000:])
+        sys.exit(f"Stage {name} exited with {proc.returncode} (log: {log_path})")
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_divisor = 1024**2 if sys.platform == "darwin" else 1024
+    print(f"{elapsed:>8.2f}s")
+    return {
+        "seconds": round(elapsed, 3),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(usage.ru_maxrss / rss_divisor, 1),
+    }
+
+
+def db_size_mb(db_path):
+    """Size of the DuckDB file plus its WAL, if any."""
+    paths = [db_path, db_path.with_name(db_path.name + ".wal")]
+    return round(sum(p.stat().st_size for p in paths if p.exists()) / 1024**2, 1)
+
+
+def load_synthetic_artists(db_path, raw_dir):
+    """Fill the artists table with generated genres, standing in for enrichment."""
+    con = duckdb.connect(str(db_path))
+    con.execute("DELETE FROM artists")
+    con.execute(
+        """
+        INSERT INTO artists (artist_name, genres, enriched_at)
+        SELECT artist_name, NULLIF(genres, ''), now()
+        FROM read_csv(?, header = true, all_varchar = true)
+    """,
+        [str(raw_dir / "synthetic_artists.csv")],
+    )
+    con.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SCRIPTS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_size(plays, args):
+    """Run every stage for one history size; returns a list of result rows."""
+    size_dir = args.work_dir / f"{plays}"
+    raw_dir = size_dir / "raw"
+    db_path = size_dir / "spotify.duckdb"
+    size_dir.mkdir(parents=True, exist_ok=True)
+    python = sys.executable
+
+    print(f"\n{plays:,} plays")
+    results = []
+
+    def record(stage, usage):
+        row = {"plays": plays, "stage": stage, **usage}
+        row["plays_per_second"] = round(plays / usage["seconds"]) if usage["seconds"] else None
+        row["db_size_mb"] = db_size_mb(db_path)
+        results.append(row)
+
+    if args.regenerate or not (raw_dir / "synthetic_artists.csv").exists():
+        usage = run_stage(
+            "generate",
+            # --force: raw_dir is this benchmark's own cache, possibly left half-written
+            [python, SCRIPTS_DIR / "generate_synthetic_history.py", "--plays", str(plays), "--out", raw_dir, "--force"],
+            size_dir / "generate.log",
+        )
+        results.append({"plays": plays, "stage": "generate", **usage})
+
+    for path in (db_path, db_path.with_name(db_path.name + ".wal")):
+        path.unlink(missing_ok=True)
+
+    ingest = [python, SCRIPTS_DIR / "ingest_spotify.py", "--data-dir", raw_dir, "--db", db_path]
+    ingest += ["--engine", args.engine, "--workers", str(args.workers)]
+    record("ingest", run_stage("ingest", ingest, size_dir / "ingest.log"))
+    record(
+        "ingest_incremental",
+        run_stage("ingest_incremental", ingest + ["--incremental"], size_dir / "ingest_incremental.log"),
+    )
+
+    load_synthetic_artists(db_path, raw_dir)
+    record(
+        "seed_genres",
+        run_stage(
+            "seed_genres",
+            [python, SCRIPTS_DIR / "seed_genre_mappings.py", "--db", db_path],
+            size_dir / "seed_genres.log",
+        ),
+    )
+
+    postgres_url = os.getenv("BENCHMARK_POSTGRES_URL")
+    if postgres_url:
+        record(
+            "sync",
+            run_stage(
+                "sync",
+                [python, SCRIPTS_DIR / "sync_to_postgres.py", "--db", db_path],
+                size_dir / "sync.log",
+                env={**os.environ, "POSTGRES_URL": postgres_url},
+            ),
+        )
+    else:
+        print(f"  {'sync':<20}skipped (BENCHMARK_POSTGRES_URL not set)")
+
+    if not args.keep:
+        for path in (db_path, db_path.with_name(db_path.name + ".wal")):
+            path.unlink(missing_ok=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="100000",
+        help="Comma-separated play counts to benchmark (default: 100000)",
+    )
+    parser.add_argument("--engine", choices=["python", "sql"], default="python", help="Ingest engine")
+    parser.add_argument("--workers", type=int, default=1, help="Ingest --workers (python engine)")
+    parser.add_argument("--work-dir", type=Path, default=WORK_DIR, help="Synthetic exports and scratch DBs")
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH, help="JSON file results are appended to")
+    parser.add_argument("--regenerate", action="store_true", help="Regenerate cached synthetic exports")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch databases")
+    args = parser.parse_args()
+
+    try:
+        sizes = [int(size.replace("_", "")) for size in args.sizes.split(",")]
+    except ValueError:
+        parser.error(f"--sizes must be comma-separated integers, got {args.sizes!r}")
+
+    print("=" * 72)
+    print("PIPELINE BENCHMARK")
+    print("=" * 72)
+    started_at = datetime.now().isoformat(timespec="seconds")
+    results = []
+    for plays in sizes:
+        results.extend(benchmark_size(plays, args))
+
+    run = {
+        "started_at": started_at,
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "engine": args.engine,
+        "workers": args.workers,
+        "results": results,
+    }
+    history = json.loads(args.results.read_text()) if args.results.exists() else []
+    history.append(run)
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+    args.results.write_text(json.dumps(history, indent=2) + "\n")
+
+    print("\n" + "=" * 72)
+    print(f"{'Plays':>12} {'Stage':<20} {'Seconds':>9} {'Plays/s':>10} {'Peak RSS MB':>12} {'DB MB':>8}")
+    print("-" * 72)
+    for row in results:
+        if row["stage"] == "generate":
+            continue
+        print(
+            f"{row['plays']:>12,} {row['stage']:<20} {row['seconds']:>9.2f} "
+            f"{row['plays_per_second'] or 0:>10,} {row['peak_rss_mb']:>12.1f} {row['db_size_mb']:>8.1f}"
+        )
+    print("=" * 72)
+    print(f"\nResults appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
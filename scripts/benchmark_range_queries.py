@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark date-range query latency on plays, unsorted vs sorted by played_at.
+
+Copies plays from data/spotify.duckdb into two in-memory tables, one in
+shuffled order (how rows end up after out-of-order appends) and one sorted
+by played_at (how ingest_spotify.py now writes them), then times the kind of
+date-filtered aggregations the dashboard API routes run.
+
+DuckDB skips row groups (~122k rows each) whose min/max statistics fall
+outside the filter, so the difference only shows once plays spans several
+row groups. Use --copies to replicate a small history up to that scale.
+"""
+
+import argparse
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import duckdb
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DB_PATH = DATA_DIR / "spotify.duckdb"
+
+QUERIES = {
+    "monthly trend": """
+        SELECT year_month, SUM(ms_played) AS ms
+        FROM {table}
+        WHERE date >= ?::date AND date <= ?::date
+        GROUP BY year_month
+    """,
+    "top artists": """
+        SELECT artist_name, SUM(ms_played) AS ms
+        FROM {table}
+        WHERE date >= ?::date AND date <= ?::date
+        GROUP BY artist_name
+        ORDER BY ms DESC
+        LIMIT 50
+    """,
+}
+
+
+def time_query(con, sql, params, repeat):
+    """Median wall time of `sql` in milliseconds over `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        con.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="DuckDB file to read plays from")
+    parser.add_argument("--copies", type=int, default=1, help="Replicate plays N times")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query (median reported)")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"ERROR: DuckDB database not found at {args.db}")
+        print("Please run the ingestion pipeline first.")
+        return
+
+    con = duckdb.connect()
+    con.execute(f"ATTACH '{args.db}' AS src (READ_ONLY)")
+
+    print(f"Building benchmark tables ({args.copies} cop{'y' if args.copies == 1 else 'ies'})...")
+    con.execute(
+        """
+        CREATE TABLE plays_copies AS
+        SELECT p.*
+        FROM src.plays p, range(?) AS copies(n)
+    """,
+        [args.copies],
+    )
+    con.execute("CREATE TABLE plays_unsorted AS SELECT * FROM plays_copies ORDER BY random()")
+    con.execute("CREATE TABLE plays_sorted AS SELECT * FROM plays_copies ORDER BY played_at")
+    con.execute("DROP TABLE plays_copies")
+
+    total_rows, first_date, last_date = con.execute(
+        "SELECT COUNT(*), MIN(date), MAX(date) FROM plays_sorted"
+    ).fetchone()
+    if not total_rows:
+        print("No plays to benchmark")
+        return
+
+    ranges = {
+        "last 30 days": (last_date - timedelta(days=30), last_date),
+        "last year": (last_date - timedelta(days=365), last_date),
+        "all time": (first_date, last_date),
+    }
+
+    print(f"Rows: {total_rows:,} (~{-(-total_rows // 122880)} row group(s))")
+    print("\n" + "=" * 72)
+    print(f"{'Query':<16} {'Range':<14} {'Unsorted ms':>12} {'Sorted ms':>12} {'Speedup':>10}")
+    print("-" * 72)
+    for query_name, sql in QUERIES.items():
+        for range_name, (start, end) in ranges.items():
+            params = [start.isoformat(), end.isoformat()]
+            unsorted_ms = time_query(con, sql.format(table="plays_unsorted"), params, args.repeat)
+            sorted_ms = time_query(con, sql.format(table="plays_sorted"), params, args.repeat)
+            speedup = unsorted_ms / sorted_ms if sorted_ms > 0 else 0
+            print(
+                f"{query_name:<16} {range_name:<14} "
+                f"{unsorted_ms:>12.2f} {sorted_ms:>12.2f} {speedup:>9.1f}x"
+            )
+    print("=" * 72)
+
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
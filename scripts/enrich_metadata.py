@@ -4,19 +4,36 @@ Enrich DuckDB with Spotify API metadata.
 Populates tracks, artists, and audio_features tables.
 """
 
+import argparse
+import asyncio
+import json
 import os
+import time
 import duckdb
+from contextlib import contextmanager
 import spotipy
+from spotipy.cache_handler import MemoryCacheHandler
 from spotipy.oauth2 import SpotifyClientCredentials
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+from api_cache import DEFAULT_TTL_DAYS, CachedSpotify, ResponseCache
+from enrichment_metrics import InstrumentedSpotify, RunMetrics, record_run, write_textfile
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 DB_PATH = DATA_DIR / "spotify.duckdb"
 
+JOB_CHUNK_SIZE = 1000  # Due jobs read per query; results are checkpointed per API batch
+MAX_JOB_ATTEMPTS = 5  # Failed attempts before a job is parked
+RETRY_BASE_MINUTES = 2  # Backoff after the first failure, doubling per attempt
+BISECT_BACKOFF_SECONDS = 0.25  # Wait before retrying halves of a failed batch, doubling per split
+# Errors about the credentials or app rather than the IDs; splitting a batch can't help
+UNSPLITTABLE_STATUSES = {401, 403}
+REFRESH_BUDGET = 20  # API requests per run spent refreshing stale rows (50 items each)
+REFRESH_AFTER_DAYS = 30  # Rows enriched longer ago than this are due a refresh
 
-def get_spotify_client():
-    """Initialize Spotify API client from environment variables."""
+
+def get_spotify_credentials():
+    """Read (client_id, client_secret) from environment variables."""
     client_id = os.getenv('SPOTIFY_CLIENT_ID')
     client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
     
@@ -25,201 +42,1242 @@ def get_spotify_client():
             "Missing Spotify credentials. Set SPOTIFY_CLIENT_ID and "
             "SPOTIFY_CLIENT_SECRET environment variables."
         )
+    return client_id, client_secret
+
+
+def get_spotify_client():
+    """
+    Initialize Spotify API client from environment variables.
+    
+    SPOTIFY_API_URL / SPOTIFY_TOKEN_URL, when set, point it at another
+    server (e.g. scripts/fake_spotify_server.py), as they do for AsyncSpotify.
+    """
+    client_id, client_secret = get_spotify_credentials()
     
-    return spotipy.Spotify(
-        auth_manager=SpotifyClientCredentials(
-            client_id=client_id,
-            client_secret=client_secret
+    token_url = os.getenv('SPOTIFY_TOKEN_URL')
+    auth_manager = SpotifyClientCredentials(
+        client_id=client_id,
+        client_secret=client_secret,
+        # Don't share spotipy's .cache token file between different servers
+        cache_handler=MemoryCacheHandler() if token_url else None,
+    )
+    if token_url:
+        auth_manager.OAUTH_TOKEN_URL = token_url
+    sp = spotipy.Spotify(auth_manager=auth_manager)
+    api_url = os.getenv('SPOTIFY_API_URL')
+    if api_url:
+        sp.prefix = api_url.rstrip('/') + '/'
+    return sp
+
+
+def ensure_registered_columns(con):
+    """
+    Add registered columns missing from the tracks/artists/albums tables,
+    e.g. in databases created before a column was added to TRACK_FIELDS.
+    """
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS albums (
+            spotify_album_id TEXT PRIMARY KEY,
+            enriched_at TIMESTAMP
+        )
+    """)
+    # No longer written, but the dashboard falls back to it for tracks enriched
+    # before the albums table, so queries need it to exist in newer databases too
+    con.execute("ALTER TABLE tracks ADD COLUMN IF NOT EXISTS album_image_url VARCHAR")
+    for table, fields in REGISTERED_TABLES.items():
+        existing = {
+            row[0] for row in con.execute(
+                "SELECT column_name FROM duckdb_columns() WHERE table_name = ?", [table]
+            ).fetchall()
+        }
+        for column, (column_type, _) in fields.items():
+            if column not in existing:
+                con.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                print(f"Added {column} column to {table} table")
+
+
+def create_jobs_table(con):
+    """One row per track/artist to enrich, so a run can stop and resume at any point."""
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS enrichment_jobs (
+            entity TEXT NOT NULL,            -- 'track' or 'artist'
+            id TEXT NOT NULL,                -- spotify_track_uri / artist_name
+            spotify_id TEXT NOT NULL,        -- ID sent to the API
+            status TEXT NOT NULL DEFAULT 'pending',  -- pending | done | parked
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at TIMESTAMP NOT NULL DEFAULT '1970-01-01',
+            updated_at TIMESTAMP,
+            priority BIGINT NOT NULL DEFAULT 0,  -- ms_played of the track/artist; drained highest first
+            PRIMARY KEY (entity, id)
         )
+    """)
+    con.execute("ALTER TABLE enrichment_jobs ADD COLUMN IF NOT EXISTS priority BIGINT DEFAULT 0")
+
+
+# Listening time per track URI / artist name, summed over play_facts by
+# integer ID first so the strings are only joined once per track/artist
+TRACK_MS_PLAYED_SQL = """
+    SELECT d.spotify_track_uri AS id, SUM(f.ms_played) AS ms_played
+    FROM (SELECT track_id, SUM(ms_played) AS ms_played FROM play_facts GROUP BY track_id) f
+    JOIN track_dim d ON d.track_id = f.track_id
+    WHERE d.spotify_track_uri IS NOT NULL
+    GROUP BY d.spotify_track_uri
+"""
+
+ARTIST_MS_PLAYED_SQL = """
+    SELECT a.artist_name AS id, f.ms_played
+    FROM (SELECT artist_id, SUM(ms_played) AS ms_played FROM play_facts GROUP BY artist_id) f
+    JOIN artist_dim a ON a.artist_id = f.artist_id
+"""
+
+
+def create_ms_played_tables(con):
+    """
+    Aggregate listening time per track URI / artist name once per run into
+    TEMP tables (track_ms_played, artist_ms_played), which job priorities,
+    refresh order and the coverage summary read instead of re-scanning
+    play_facts. Plays don't change while enriching; IF NOT EXISTS keeps
+    repeat calls on the same connection free.
+    """
+    con.execute(f"CREATE TEMP TABLE IF NOT EXISTS track_ms_played AS {TRACK_MS_PLAYED_SQL}")
+    con.execute(f"CREATE TEMP TABLE IF NOT EXISTS artist_ms_played AS {ARTIST_MS_PLAYED_SQL}")
+
+
+def prioritize_jobs(con, entity):
+    """
+    Set each pending job's priority to the listening time of its
+    track/artist, so interrupted runs have enriched the most played first.
+    """
+    create_ms_played_tables(con)
+    ms_played_table = "artist_ms_played" if entity == "artist" else "track_ms_played"
+    con.execute(f"""
+        UPDATE enrichment_jobs
+        SET priority = m.ms_played
+        FROM {ms_played_table} m
+        WHERE enrichment_jobs.entity = ?
+          AND enrichment_jobs.status = 'pending'
+          AND enrichment_jobs.id = m.id
+          AND enrichment_jobs.priority IS DISTINCT FROM m.ms_played
+    """, [entity])
+
+
+# Conflict clause for the queue_*_jobs inserts: a done job whose row has
+# gone missing since (e.g. deleted to force re-enrichment) is queued again
+# with fresh attempts; pending and parked jobs are left as they are
+REQUEUE_DONE_SQL = """
+    ON CONFLICT (entity, id) DO UPDATE
+    SET status = 'pending', attempts = 0, last_error = NULL,
+        next_attempt_at = '1970-01-01', spotify_id = excluded.spotify_id
+    WHERE enrichment_jobs.status = 'done'
+"""
+
+
+def queue_track_jobs(con):
+    """
+    Add a pending job for every played track URI not in the tracks table.
+    
+    Reads the distinct URIs ingest keeps in track_dim rather than scanning
+    plays, so the cost follows the number of tracks, not of plays.
+    """
+    queued = con.execute(f"""
+        INSERT INTO enrichment_jobs (entity, id, spotify_id)
+        SELECT 'track', uri, split_part(uri, ':', 3)
+        FROM (SELECT DISTINCT spotify_track_uri AS uri FROM track_dim) d
+        WHERE uri IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM tracks t WHERE t.spotify_track_uri = d.uri)
+        {REQUEUE_DONE_SQL}
+    """).fetchone()[0]
+    prioritize_jobs(con, "track")
+    return queued
+
+
+def queue_audio_features_jobs(con):
+    """
+    Add a pending job for every enriched track without audio features; only
+    tracks found on Spotify can have features.
+    """
+    queued = con.execute(f"""
+        INSERT INTO enrichment_jobs (entity, id, spotify_id)
+        SELECT 'audio_features', t.spotify_track_uri, split_part(t.spotify_track_uri, ':', 3)
+        FROM tracks t
+        WHERE NOT EXISTS (
+                SELECT 1 FROM audio_features f WHERE f.spotify_track_uri = t.spotify_track_uri
+            )
+        {REQUEUE_DONE_SQL}
+    """).fetchone()[0]
+    prioritize_jobs(con, "audio_features")
+    return queued
+
+
+def queue_artist_jobs(con):
+    """
+    Add a pending job for every played artist not in the artists table whose
+    Spotify ID is known from an enriched track (via artist_dim/track_dim).
+    """
+    queued = con.execute(f"""
+        INSERT INTO enrichment_jobs (entity, id, spotify_id)
+        SELECT 'artist', a.artist_name, MIN(t.primary_artist_id)
+        FROM artist_dim a
+        JOIN track_dim d ON d.artist_id = a.artist_id
+        JOIN tracks t ON t.spotify_track_uri = d.spotify_track_uri
+        WHERE t.primary_artist_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM artists e WHERE e.artist_name = a.artist_name)
+        GROUP BY a.artist_name
+        {REQUEUE_DONE_SQL}
+    """).fetchone()[0]
+    prioritize_jobs(con, "artist")
+    return queued
+
+
+def due_jobs(con, entity, limit=JOB_CHUNK_SIZE):
+    """(id, spotify_id) of pending jobs whose retry time has come, most listened first."""
+    return con.execute("""
+        SELECT id, spotify_id
+        FROM enrichment_jobs
+        WHERE entity = ? AND status = 'pending' AND next_attempt_at <= ?
+        ORDER BY priority DESC, id
+        LIMIT ?
+    """, [entity, datetime.now(), limit]).fetchall()
+
+
+def count_due_jobs(con, entity):
+    return con.execute("""
+        SELECT COUNT(*) FROM enrichment_jobs
+        WHERE entity = ? AND status = 'pending' AND next_attempt_at <= ?
+    """, [entity, datetime.now()]).fetchone()[0]
+
+
+def finish_jobs(con, entity, ids, status, error=None):
+    """Mark jobs 'done' or 'parked' (e.g. not found on Spotify)."""
+    if not ids:
+        return
+    con.execute("""
+        UPDATE enrichment_jobs
+        SET status = ?, attempts = attempts + 1, last_error = ?, updated_at = ?
+        WHERE entity = ? AND id IN (SELECT UNNEST(from_json(?, '["VARCHAR"]')))
+    """, [status, error, datetime.now(), entity, json.dumps(ids)])
+
+
+def fail_jobs(con, entity, ids, error):
+    """
+    Record a failed attempt: retry after an exponential backoff, or park the
+    job once it has failed MAX_JOB_ATTEMPTS times.
+    """
+    now = datetime.now()
+    con.execute(f"""
+        UPDATE enrichment_jobs
+        SET attempts = attempts + 1,
+            last_error = ?,
+            status = CASE WHEN attempts + 1 >= {MAX_JOB_ATTEMPTS} THEN 'parked' ELSE 'pending' END,
+            next_attempt_at = CAST(? AS TIMESTAMP)
+                + to_minutes(CAST({RETRY_BASE_MINUTES} * pow(2, attempts) AS BIGINT)),
+            updated_at = ?
+        WHERE entity = ? AND id IN (SELECT UNNEST(from_json(?, '["VARCHAR"]')))
+    """, [str(error)[:500], now, now, entity, json.dumps(ids)])
+
+
+def retry_parked_jobs(con):
+    """Give parked jobs a fresh set of attempts."""
+    return con.execute("""
+        UPDATE enrichment_jobs
+        SET status = 'pending', attempts = 0, next_attempt_at = '1970-01-01'
+        WHERE status = 'parked'
+    """).fetchone()[0]
+
+
+def medium_image_url(images):
+    """URL of the 300x300 image, falling back to the first available."""
+    if not images:
+        return None
+    # Spotify typically provides [640x640, 300x300, 64x64]
+    medium_image = next((img for img in images if img.get('height') == 300), None)
+    return medium_image['url'] if medium_image else images[0]['url']
+
+
+def release_year(track):
+    release_date = track['album']['release_date']
+    return int(release_date.split('-')[0]) if release_date else None
+
+
+def release_decade(track):
+    year = release_year(track)
+    return f"{(year // 10) * 10}s" if year else None
+
+
+# Column registry: column -> (DuckDB type, value derived from one API object).
+# Every fetched object fills every registered column, and --backfill re-derives
+# registered columns for existing rows from cached objects, so a new column
+# only needs an entry here.
+TRACK_FIELDS = {
+    "track_name": ("VARCHAR", lambda track: track['name']),
+    "primary_artist_name": ("VARCHAR", lambda track: track['artists'][0]['name'] if track['artists'] else None),
+    "primary_artist_id": ("VARCHAR", lambda track: track['artists'][0]['id'] if track['artists'] else None),
+    "album_name": ("VARCHAR", lambda track: track['album']['name']),
+    # Album images live once per album in the albums table
+    "spotify_album_id": ("VARCHAR", lambda track: track['album'].get('id')),
+    "release_date": ("VARCHAR", lambda track: track['album']['release_date']),
+    "release_year": ("INTEGER", release_year),
+    "release_decade": ("VARCHAR", release_decade),
+    "popularity": ("INTEGER", lambda track: track['popularity']),
+    "duration_ms": ("INTEGER", lambda track: track['duration_ms']),
+    "explicit": ("BOOLEAN", lambda track: track['explicit']),
+}
+
+ARTIST_FIELDS = {
+    "genres": ("VARCHAR", lambda artist: ','.join(artist['genres']) if artist.get('genres') else None),
+    "popularity": ("INTEGER", lambda artist: artist.get('popularity', 0)),
+    "followers": ("INTEGER", lambda artist: artist.get('followers', {}).get('total', 0)),
+    "spotify_artist_id": ("VARCHAR", lambda artist: artist.get('id')),
+    "image_url": ("VARCHAR", lambda artist: medium_image_url(artist.get('images', []))),
+}
+
+# Filled from the album object embedded in every track, so albums cost no extra requests
+ALBUM_FIELDS = {
+    "album_name": ("VARCHAR", lambda album: album['name']),
+    "image_url": ("VARCHAR", lambda album: medium_image_url(album.get('images', []))),
+}
+
+# Table -> registered fields, for adding missing columns and --backfill
+REGISTERED_TABLES = {"tracks": TRACK_FIELDS, "artists": ARTIST_FIELDS, "albums": ALBUM_FIELDS}
+
+AUDIO_FEATURE_FIELDS = {
+    column: (column_type, lambda features, column=column: features.get(column))
+    for column, column_type in {
+        "danceability": "FLOAT",
+        "energy": "FLOAT",
+        "valence": "FLOAT",
+        "tempo": "FLOAT",
+        "acousticness": "FLOAT",
+        "instrumentalness": "FLOAT",
+        "speechiness": "FLOAT",
+        "loudness": "FLOAT",
+        "key": "INTEGER",
+        "mode": "INTEGER",
+        "time_signature": "INTEGER",
+    }.items()
+}
+
+# Column name -> DuckDB type, in the order track_row()/artist_row() return values
+TRACK_COLUMNS = {
+    "spotify_track_uri": "VARCHAR",
+    **{column: column_type for column, (column_type, _) in TRACK_FIELDS.items()},
+    "enriched_at": "TIMESTAMP",
+}
+
+ARTIST_COLUMNS = {
+    "artist_name": "VARCHAR",
+    **{column: column_type for column, (column_type, _) in ARTIST_FIELDS.items()},
+    "enriched_at": "TIMESTAMP",
+}
+
+ALBUM_COLUMNS = {
+    "spotify_album_id": "VARCHAR",
+    **{column: column_type for column, (column_type, _) in ALBUM_FIELDS.items()},
+    "enriched_at": "TIMESTAMP",
+}
+
+AUDIO_FEATURE_COLUMNS = {
+    "spotify_track_uri": "VARCHAR",
+    **{column: column_type for column, (column_type, _) in AUDIO_FEATURE_FIELDS.items()},
+    "enriched_at": "TIMESTAMP",
+}
+
+
+def track_row(track_uri, track):
+    """
+    TRACK_COLUMNS values for one track object from the API, under the URI it
+    was requested with (a relinked track comes back with another URI).
+    """
+    return (
+        track_uri,
+        *(derive(track) for _, derive in TRACK_FIELDS.values()),
+        datetime.now().isoformat(),
     )
 
 
-def enrich_tracks(con, sp):
-    """Fetch and store track metadata. Returns (attempted, enriched, failed) counts."""
-    print("\nEnriching tracks...")
+def artist_row(artist_name, artist):
+    """ARTIST_COLUMNS values for one artist object, under the name used in plays."""
+    return (
+        artist_name,
+        *(derive(artist) for _, derive in ARTIST_FIELDS.values()),
+        datetime.now().isoformat(),
+    )
+
+
+def album_row(album):
+    """ALBUM_COLUMNS values for one album object (full, or embedded in a track)."""
+    return (
+        album['id'],
+        *(derive(album) for _, derive in ALBUM_FIELDS.values()),
+        datetime.now().isoformat(),
+    )
+
+
+def save_albums(writer, tracks):
+    """Upsert the albums embedded in track objects (None entries are skipped)."""
+    writer.upsert(
+        "albums", ALBUM_COLUMNS, [album_row(track['album']) for track in tracks if track and track['album'].get('id')]
+    )
+
+
+def audio_features_row(track_uri, features):
+    """AUDIO_FEATURE_COLUMNS values for one audio features object."""
+    return (
+        track_uri,
+        *(derive(features) for _, derive in AUDIO_FEATURE_FIELDS.values()),
+        datetime.now().isoformat(),
+    )
+
+
+# Job entity -> (table, columns, row builder(track URI, API object)) for entities keyed by track URI
+URI_ENTITIES = {
+    "track": ("tracks", TRACK_COLUMNS, track_row),
+    "audio_features": ("audio_features", AUDIO_FEATURE_COLUMNS, audio_features_row),
+}
+
+
+class BulkWriter:
+    """
+    Writes enrichment results one API batch at a time.
+    
+    Each batch is sent to DuckDB as a single JSON document (one array per
+    column) and unnested into one statement, instead of one statement per
+    row. Callers group a batch's writes (and its job status updates) in
+    transaction(), so a batch is either fully recorded or not at all. Time
+    spent writing is tracked so it can be reported apart from time spent
+    waiting on the API.
+    """
+    
+    def __init__(self, con):
+        self.con = con
+        self.seconds = 0.0
+        self.rows = 0
+    
+    @contextmanager
+    def transaction(self):
+        start = time.perf_counter()
+        self.con.execute("BEGIN TRANSACTION")
+        try:
+            yield
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+        finally:
+            self.seconds += time.perf_counter() - start
+    
+    def _execute(self, sql, columns, rows):
+        """Run `sql` with `rows` bound as the unnested subquery {batch}."""
+        # One statement can't write the same key twice, e.g. an album shared by several tracks
+        rows = list({row[0]: row for row in rows}.values())
+        payload = json.dumps(dict(zip(columns, zip(*rows))))
+        schema = json.dumps({column: [column_type] for column, column_type in columns.items()})
+        batch = f"""(
+            SELECT {', '.join(f'UNNEST(c.{column}) AS {column}' for column in columns)}
+            FROM (SELECT from_json(?, '{schema}') AS c)
+        )"""
+        self.con.execute(sql.format(batch=batch), [payload])
+        self.rows += len(rows)
+    
+    def upsert(self, table, columns, rows):
+        """Insert or replace `rows` (tuples in `columns` order); the last row per key wins."""
+        if rows:
+            self._execute(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) SELECT * FROM {{batch}}",
+                columns,
+                rows,
+            )
+    
+    def update(self, table, columns, rows):
+        """Set columns[1:] on existing rows matched by the first column."""
+        if rows:
+            key, *values = columns
+            assignments = ", ".join(f"{column} = batch.{column}" for column in values)
+            self._execute(
+                f"UPDATE {table} SET {assignments} FROM {{batch}} AS batch "
+                f"WHERE {table}.{key} = batch.{key}",
+                columns,
+                rows,
+            )
+
+
+def id_batches(pairs, size=50):
+    """
+    Group (row key, Spotify ID) pairs into batches of at most `size`
+    distinct IDs (50 is the API limit for tracks and artists). Yields
+    (spotify_ids, keys_by_id); an ID can map to several keys, e.g. an artist
+    played under two names after a rename.
+    """
+    keys_by_id = {}
+    for key, spotify_id in pairs:
+        keys_by_id.setdefault(spotify_id, []).append(key)
+    spotify_ids = list(keys_by_id)
+    for i in range(0, len(spotify_ids), size):
+        batch = spotify_ids[i:i+size]
+        yield batch, {spotify_id: keys_by_id[spotify_id] for spotify_id in batch}
+
+
+def save_uri_batch(con, writer, entity, jobs, objects):
+    """
+    Store the API objects for one batch of track-URI keyed jobs ('track' or
+    'audio_features') and checkpoint the jobs in one transaction.
+    Returns (enriched, not_found) counts.
+    """
+    table, columns, make_row = URI_ENTITIES[entity]
+    rows = []
+    done = []
+    not_found = []
+    for (uri, _), obj in zip(jobs, objects):
+        if obj:
+            rows.append(make_row(uri, obj))
+            done.append(uri)
+        else:
+            not_found.append(uri)
+    with writer.transaction():
+        writer.upsert(table, columns, rows)
+        if entity == "track":
+            save_albums(writer, objects)
+        finish_jobs(con, entity, done, "done")
+        finish_jobs(con, entity, not_found, "parked", "not found on Spotify")
+    return len(done), len(not_found)
+
+
+def save_artist_batch(con, writer, artist_ids, names_by_id, artists_data):
+    """
+    Store one artists response under every name using each ID and
+    checkpoint its jobs in one transaction. Returns (enriched, not_found).
+    """
+    rows = []
+    not_found = []
+    for artist_id, artist in zip(artist_ids, artists_data['artists']):
+        for artist_name in names_by_id[artist_id]:
+            if artist:
+                rows.append(artist_row(artist_name, artist))
+            else:
+                not_found.append(artist_name)
+    with writer.transaction():
+        writer.upsert("artists", ARTIST_COLUMNS, rows)
+        finish_jobs(con, "artist", [row[0] for row in rows], "done")
+        finish_jobs(con, "artist", not_found, "parked", "not found on Spotify")
+    return len(rows), len(not_found)
+
+
+def http_status(error):
+    """HTTP status of an API error, if any."""
+    # spotipy raises SpotifyException(http_status=...), AsyncSpotify SpotifyAPIError(status=...)
+    return getattr(error, 'http_status', None) or getattr(error, 'status', None)
+
+
+def is_client_error(error):
+    """True for 4xx API errors other than 429, which retrying the same request won't fix."""
+    status = http_status(error)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def fetch_bisecting(fetch, items, depth=0):
+    """
+    Call fetch(items); if it raises, split the items in half and retry each
+    half, down to single items, so one bad ID (e.g. a malformed or local-file
+    URI) can't fail the rest of its batch. Transient errors back off
+    exponentially before the retry; client errors split right away.
     
-    # Ensure primary_artist_id column exists
+    Returns ([(items, response)], [(item, error)]).
+    """
     try:
-        con.execute("ALTER TABLE tracks ADD COLUMN primary_artist_id VARCHAR")
-        print("Added primary_artist_id column to tracks table")
-    except Exception:
-        # Column already exists
-        pass
-    
-    # Get unique track URIs that need enrichment
-    tracks = con.execute("""
-        SELECT DISTINCT spotify_track_uri
-        FROM plays
-        WHERE spotify_track_uri IS NOT NULL
-          AND spotify_track_uri NOT IN (SELECT spotify_track_uri FROM tracks)
-        LIMIT 10000
-    """).fetchall()
+        return [(items, fetch(items))], []
+    except Exception as e:
+        if http_status(e) in UNSPLITTABLE_STATUSES:
+            raise
+        if len(items) == 1:
+            return [], [(items[0], e)]
+        if not is_client_error(e):
+            time.sleep(BISECT_BACKOFF_SECONDS * 2**depth)
+        middle = len(items) // 2
+        ok_left, failed_left = fetch_bisecting(fetch, items[:middle], depth + 1)
+        ok_right, failed_right = fetch_bisecting(fetch, items[middle:], depth + 1)
+        return ok_left + ok_right, failed_left + failed_right
+
+
+async def fetch_bisecting_async(fetch, items, depth=0):
+    """fetch_bisecting() for an awaitable fetch; both halves are retried concurrently."""
+    try:
+        return [(items, await fetch(items))], []
+    except Exception as e:
+        if http_status(e) in UNSPLITTABLE_STATUSES:
+            raise
+        if len(items) == 1:
+            return [], [(items[0], e)]
+        if not is_client_error(e):
+            await asyncio.sleep(BISECT_BACKOFF_SECONDS * 2**depth)
+        middle = len(items) // 2
+        (ok_left, failed_left), (ok_right, failed_right) = await asyncio.gather(
+            fetch_bisecting_async(fetch, items[:middle], depth + 1),
+            fetch_bisecting_async(fetch, items[middle:], depth + 1),
+        )
+        return ok_left + ok_right, failed_left + failed_right
+
+
+async def as_completed(coros):
+    """
+    Yield the results of `coros` as they finish. If one raises (e.g. an
+    error that applies to every request), the rest are cancelled rather than
+    left running with unretrieved exceptions.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def record_failures(con, writer, entity, failures):
+    """
+    Checkpoint jobs whose IDs failed on their own: client errors are
+    quarantined (parked) at once, anything else is retried after a backoff.
+    `failures` holds (job ids, error) pairs.
+    """
+    with writer.transaction():
+        for ids, error in failures:
+            if is_client_error(error):
+                finish_jobs(con, entity, ids, "parked", str(error)[:500])
+            else:
+                fail_jobs(con, entity, ids, error)
+
+
+def job_spotify_ids(jobs):
+    """Spotify IDs of (job id, spotify_id) jobs, for the API call."""
+    return [spotify_id for _, spotify_id in jobs]
+
+
+def save_uri_results(con, writer, entity, results, failures):
+    """
+    Save the outcome of one bisected batch of track-URI keyed jobs. Returns
+    (enriched, failed) counts, not-found counted as failed.
+    """
+    enriched = 0
+    failed = len(failures)
+    for jobs, objects in results:
+        batch_enriched, batch_not_found = save_uri_batch(con, writer, entity, jobs, objects)
+        enriched += batch_enriched
+        failed += batch_not_found
+    if failures:
+        print(f"  {len(failures)} {entity} ID(s) failed on their own: {failures[0][1]}")
+        record_failures(con, writer, entity, [([job[0]], error) for job, error in failures])
+    return enriched, failed
+
+
+def drain_uri_jobs(con, writer, entity, fetch, batch_size):
+    """
+    Drain due jobs for a track-URI keyed entity, `batch_size` IDs per
+    fetch() call (a list of API objects, in request order).
+    Returns (attempted, enriched, failed) counts.
+    """
+    total = count_due_jobs(con, entity)
+    enriched = 0
+    failed = 0
+    processed = 0
     
-    print(f"Found {len(tracks)} tracks to enrich")
+    while jobs := due_jobs(con, entity):
+        for i in range(0, len(jobs), batch_size):
+            batch = jobs[i:i+batch_size]
+            processed += len(batch)
+            results, failures = fetch_bisecting(lambda items: fetch(job_spotify_ids(items)), batch)
+            batch_enriched, batch_failed = save_uri_results(con, writer, entity, results, failures)
+            enriched += batch_enriched
+            failed += batch_failed
+            print(f"  Processed {processed}/{total}")
     
-    attempted = len(tracks)
+    return processed, enriched, failed
+
+
+async def drain_uri_jobs_async(con, writer, entity, fetch, batch_size):
+    """
+    drain_uri_jobs() with batches requested concurrently through an
+    awaitable fetch(). Results are checkpointed as they arrive, from this
+    single coroutine, so DuckDB still sees one writer.
+    """
+    total = count_due_jobs(con, entity)
     enriched = 0
     failed = 0
+    processed = 0
+    
+    async def fetch_jobs(jobs):
+        return await fetch(job_spotify_ids(jobs))
+    
+    async def fetch_batch(batch):
+        return batch, *await fetch_bisecting_async(fetch_jobs, batch)
+    
+    while jobs := due_jobs(con, entity):
+        requests = [fetch_batch(jobs[i:i+batch_size]) for i in range(0, len(jobs), batch_size)]
+        async for batch, results, failures in as_completed(requests):
+            processed += len(batch)
+            batch_enriched, batch_failed = save_uri_results(con, writer, entity, results, failures)
+            enriched += batch_enriched
+            failed += batch_failed
+            print(f"  Processed {processed}/{total}")
+    
+    return processed, enriched, failed
+
+
+def save_artist_results(con, writer, names_by_id, results, failures):
+    """Save the outcome of one bisected artist batch. Returns (enriched, not_found, failed)."""
+    enriched = 0
+    not_found = 0
+    for artist_ids, artists_data in results:
+        batch_enriched, batch_not_found = save_artist_batch(
+            con, writer, artist_ids, names_by_id, artists_data
+        )
+        enriched += batch_enriched
+        not_found += batch_not_found
+    failed = sum(len(names_by_id[artist_id]) for artist_id, _ in failures)
+    if failures:
+        print(f"  {len(failures)} artist ID(s) failed on their own: {failures[0][1]}")
+        record_failures(
+            con, writer, "artist", [(names_by_id[artist_id], error) for artist_id, error in failures]
+        )
+    return enriched, not_found, failed
+
+
+def enrich_tracks(con, sp, writer):
+    """Drain due track jobs. Returns (attempted, enriched, failed) counts."""
+    print("\nEnriching tracks...")
+    
+    queued = queue_track_jobs(con)
+    print(f"Found {count_due_jobs(con, 'track')} tracks to enrich ({queued} newly queued)")
     
     # Process in batches of 50 (Spotify API limit)
-    for i in range(0, len(tracks), 50):
-        batch = tracks[i:i+50]
-        track_ids = [uri[0].split(':')[-1] for uri in batch]
-        
-        try:
-            tracks_data = sp.tracks(track_ids)
-            
-            for track in tracks_data['tracks']:
-                if not track:
-                    failed += 1
-                    continue
-                
-                uri = track['uri']
-                release_date = track['album']['release_date']
-                
-                # Extract year
-                release_year = int(release_date.split('-')[0]) if release_date else None
-                
-                # Calculate decade
-                release_decade = None
-                if release_year:
-                    decade_start = (release_year // 10) * 10
-                    release_decade = f"{decade_start}s"
-                
-                # Get primary artist ID
-                primary_artist_id = track['artists'][0]['id'] if track['artists'] else None
-                
-                # Get album image URL (prefer medium size, fallback to first available)
-                album_images = track['album'].get('images', [])
-                album_image_url = None
-                if album_images:
-                    # Spotify typically provides [640x640, 300x300, 64x64]
-                    # Get medium (300x300) or first available
-                    medium_image = next((img for img in album_images if img.get('height') == 300), None)
-                    album_image_url = medium_image['url'] if medium_image else album_images[0]['url']
-                
-                con.execute("""
-                    INSERT OR REPLACE INTO tracks (
-                        spotify_track_uri, track_name, primary_artist_name, primary_artist_id,
-                        album_name, album_image_url, release_date, release_year, release_decade,
-                        popularity, duration_ms, explicit, enriched_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, [
-                    uri,
-                    track['name'],
-                    track['artists'][0]['name'] if track['artists'] else None,
-                    primary_artist_id,
-                    track['album']['name'],
-                    album_image_url,
-                    release_date,
-                    release_year,
-                    release_decade,
-                    track['popularity'],
-                    track['duration_ms'],
-                    track['explicit'],
-                    datetime.now().isoformat()
-                ])
-                enriched += 1
-            
-            print(f"  Processed {i + len(batch)}/{len(tracks)}")
-            
-        except Exception as e:
-            print(f"  Error processing batch {i}: {e}")
-            failed += len(batch)
-            continue
+    return drain_uri_jobs(con, writer, "track", lambda ids: sp.tracks(ids)['tracks'], 50)
+
+
+def enrich_audio_features(con, sp, writer):
+    """
+    Drain due audio features jobs, 100 tracks per request (the endpoint's
+    limit). Returns (attempted, enriched, failed) counts.
+    """
+    print("\nEnriching audio features...")
     
-    return attempted, enriched, failed
+    queued = queue_audio_features_jobs(con)
+    print(f"Found {count_due_jobs(con, 'audio_features')} tracks without audio features ({queued} newly queued)")
+    
+    try:
+        return drain_uri_jobs(con, writer, "audio_features", sp.audio_features, 100)
+    except Exception as e:
+        if http_status(e) != 403:
+            raise
+        print(f"  ⚠️  Audio features endpoint not available to this app, skipping ({e})")
+        return 0, 0, 0
 
 
-def enrich_artists(con, sp):
-    """Fetch and store artist metadata. Returns (attempted, enriched, not_found, failed) counts."""
+def enrich_artists(con, sp, writer):
+    """Drain due artist jobs. Returns (attempted, enriched, not_found, failed) counts."""
     print("\nEnriching artists...")
     
-    # Get unique artists with their Spotify artist ID from enriched tracks
-    artists = con.execute("""
-        SELECT DISTINCT 
-            p.artist_name,
-            t.primary_artist_id
-        FROM plays p
-        JOIN tracks t ON p.spotify_track_uri = t.spotify_track_uri
-        WHERE p.artist_name NOT IN (SELECT artist_name FROM artists)
-          AND t.primary_artist_id IS NOT NULL
-        LIMIT 5000
-    """).fetchall()
+    # Artist IDs come from enriched tracks, so queue after track enrichment
+    queued = queue_artist_jobs(con)
+    total = count_due_jobs(con, "artist")
+    print(f"Found {total} artists to enrich ({queued} newly queued)")
+    
+    enriched = 0
+    not_found = 0
+    failed = 0
+    processed = 0
+    
+    while jobs := due_jobs(con, "artist"):
+        for artist_ids, names_by_id in id_batches(jobs):
+            processed += sum(len(names) for names in names_by_id.values())
+            # Up to 50 artists per request via the several-artists endpoint
+            results, failures = fetch_bisecting(sp.artists, artist_ids)
+            batch_enriched, batch_not_found, batch_failed = save_artist_results(
+                con, writer, names_by_id, results, failures
+            )
+            enriched += batch_enriched
+            not_found += batch_not_found
+            failed += batch_failed
+            print(f"  Processed {processed}/{total}")
+    
+    return processed, enriched, not_found, failed
+
+
+async def enrich_tracks_async(con, client, writer):
+    """enrich_tracks() with batches requested concurrently through `client` (an AsyncSpotify)."""
+    print("\nEnriching tracks (async)...")
+    queued = queue_track_jobs(con)
+    print(f"Found {count_due_jobs(con, 'track')} tracks to enrich ({queued} newly queued)")
     
-    print(f"Found {len(artists)} artists to enrich")
+    async def fetch(ids):
+        return (await client.tracks(ids))['tracks']
+    
+    return await drain_uri_jobs_async(con, writer, "track", fetch, 50)
+
+
+async def enrich_audio_features_async(con, client, writer):
+    """enrich_audio_features() with batches requested concurrently through `client`."""
+    print("\nEnriching audio features (async)...")
+    queued = queue_audio_features_jobs(con)
+    print(f"Found {count_due_jobs(con, 'audio_features')} tracks without audio features ({queued} newly queued)")
+    
+    try:
+        return await drain_uri_jobs_async(con, writer, "audio_features", client.audio_features, 100)
+    except Exception as e:
+        if http_status(e) != 403:
+            raise
+        print(f"  ⚠️  Audio features endpoint not available to this app, skipping ({e})")
+        return 0, 0, 0
+
+
+async def enrich_artists_async(con, client, writer):
+    """enrich_artists() with artist batches requested concurrently through `client`."""
+    print("\nEnriching artists (async)...")
+    queued = queue_artist_jobs(con)
+    total = count_due_jobs(con, "artist")
+    print(f"Found {total} artists to enrich ({queued} newly queued)")
     
-    attempted = len(artists)
     enriched = 0
     not_found = 0
     failed = 0
+    processed = 0
+    
+    async def fetch_batch(artist_ids, names_by_id):
+        return names_by_id, *await fetch_bisecting_async(client.artists, artist_ids)
+    
+    while jobs := due_jobs(con, "artist"):
+        requests = [fetch_batch(artist_ids, names_by_id) for artist_ids, names_by_id in id_batches(jobs)]
+        async for names_by_id, results, failures in as_completed(requests):
+            processed += sum(len(names) for names in names_by_id.values())
+            batch_enriched, batch_not_found, batch_failed = save_artist_results(
+                con, writer, names_by_id, results, failures
+            )
+            enriched += batch_enriched
+            not_found += batch_not_found
+            failed += batch_failed
+            print(f"  Processed {processed}/{total}")
+    
+    return processed, enriched, not_found, failed
+
+
+# Columns of backfill_checked, keyed by row first (see BulkWriter._execute)
+BACKFILL_CHECKED_COLUMNS = {
+    "row_key": "VARCHAR",
+    "table_name": "VARCHAR",
+    "column_name": "VARCHAR",
+    "checked_at": "TIMESTAMP",
+}
+
+
+def create_backfill_checked_table(con):
+    """
+    Rows a backfill fetched whose API object has no value for a column (an
+    artist without genres or image, an album without art), so later
+    backfills don't select them again.
+    """
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS backfill_checked (
+            row_key TEXT NOT NULL,           -- spotify_track_uri / artist_name / spotify_album_id
+            table_name TEXT NOT NULL,
+            column_name TEXT NOT NULL,
+            checked_at TIMESTAMP,
+            PRIMARY KEY (row_key, table_name, column_name)
+        )
+    """)
+
+
+def backfill_columns(con, sp, writer, table, columns):
+    """
+    Re-derive registered `columns` for existing rows where any of them is
+    NULL, from the same API objects enrichment uses. With the response cache
+    enabled these come from disk, so only uncached objects hit the network.
+    A column the API object has no value for is recorded in
+    backfill_checked and not selected again.
+    Returns (attempted, updated, failed) counts; updated rows are those
+    whose values changed.
+    """
+    batch_size = 50
+    if table == "tracks":
+        key, id_expr, fields, fetch = (
+            "spotify_track_uri", "split_part(spotify_track_uri, ':', 3)", TRACK_FIELDS, sp.tracks
+        )
+    elif table == "albums":
+        # Several-albums endpoint takes at most 20 IDs
+        key, id_expr, fields, fetch = "spotify_album_id", "spotify_album_id", ALBUM_FIELDS, sp.albums
+        batch_size = 20
+    else:
+        key, id_expr, fields, fetch = "artist_name", "spotify_artist_id", ARTIST_FIELDS, sp.artists
+    columns = [column for column in columns if column in fields]
+    if not columns:
+        return 0, 0, 0
+    
+    print(f"\nBackfilling {table}: {', '.join(columns)}")
+    create_backfill_checked_table(con)
+    unchecked_nulls = " OR ".join(
+        f"""({column} IS NULL AND NOT EXISTS (
+                SELECT 1 FROM backfill_checked c
+                WHERE c.row_key = t.{key} AND c.table_name = '{table}' AND c.column_name = '{column}'
+            ))"""
+        for column in columns
+    )
+    rows = con.execute(f"""
+        SELECT {key}, {id_expr}, {', '.join(columns)}
+        FROM {table} t
+        WHERE {id_expr} IS NOT NULL
+          AND ({unchecked_nulls})
+    """).fetchall()
+    print(f"Found {len(rows)} {table} with missing values")
+    stored = {row[0]: row[2:] for row in rows}
+    
+    update_columns = {key: "VARCHAR", **{column: fields[column][0] for column in columns}}
+    updated = 0
+    failed = 0
+    processed = 0
     
-    for i, (artist_name, artist_id) in enumerate(artists):
+    for spotify_ids, keys_by_id in id_batches([row[:2] for row in rows], batch_size):
+        batch_keys = sum(len(keys_by_id[spotify_id]) for spotify_id in spotify_ids)
+        processed += batch_keys
         try:
-            # Get full artist metadata using the stored artist ID
-            # This is just 1 API call per artist!
-            artist = sp.artist(artist_id)
-            
-            if artist:
-                # Get artist image URL (prefer medium size, fallback to first available)
-                artist_images = artist.get('images', [])
-                image_url = None
-                if artist_images:
-                    # Get medium (300x300) or first available
-                    medium_image = next((img for img in artist_images if img.get('height') == 300), None)
-                    image_url = medium_image['url'] if medium_image else artist_images[0]['url']
-                
-                con.execute("""
-                    INSERT OR REPLACE INTO artists (
-                        artist_name, genres, popularity, followers,
-                        spotify_artist_id, image_url, enriched_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, [
-                    artist_name,
-                    ','.join(artist['genres']) if artist.get('genres') else None,
-                    artist.get('popularity', 0),
-                    artist.get('followers', {}).get('total', 0),
-                    artist.get('id'),
-                    image_url,
-                    datetime.now().isoformat()
-                ])
-                enriched += 1
-            else:
-                not_found += 1
-            
-            if (i + 1) % 100 == 0:
-                print(f"  Processed {i + 1}/{len(artists)}")
-                
+            objects = fetch(spotify_ids)[table]
         except Exception as e:
-            print(f"  Error processing artist {artist_name}: {e}")
-            failed += 1
+            print(f"  Error processing batch {processed - batch_keys}: {e}")
+            failed += batch_keys
             continue
+        
+        values = []
+        checked = {column: [] for column in columns}
+        now = datetime.now().isoformat()
+        for spotify_id, obj in zip(spotify_ids, objects):
+            if not obj:
+                failed += len(keys_by_id[spotify_id])
+                continue
+            derived = tuple(fields[column][1](obj) for column in columns)
+            for row_key in keys_by_id[spotify_id]:
+                if derived != stored[row_key]:
+                    values.append((row_key, *derived))
+                for column, value in zip(columns, derived):
+                    if value is None:
+                        checked[column].append((row_key, table, column, now))
+        with writer.transaction():
+            writer.update(table, update_columns, values)
+            if table == "tracks":
+                save_albums(writer, objects)
+            # One upsert per column: BulkWriter keeps one row per row_key per statement
+            for column_rows in checked.values():
+                writer.upsert("backfill_checked", BACKFILL_CHECKED_COLUMNS, column_rows)
+        updated += len(values)
+        
+        if processed % 500 < batch_keys or processed == len(rows):
+            print(f"  Processed {processed}/{len(rows)}")
     
-    return attempted, enriched, not_found, failed
+    return len(rows), updated, failed
+
+
+def run_backfill(con, sp, writer, columns):
+    """Backfill `columns` (all registered columns if empty) and print a summary."""
+    results = {}
+    # Tracks first: their objects also fill the albums table
+    for table, fields in REGISTERED_TABLES.items():
+        results[table] = backfill_columns(con, sp, writer, table, columns or list(fields))
+    
+    print("\n" + "=" * 70)
+    print("BACKFILL COMPLETE")
+    print("=" * 70)
+    for table, (attempted, updated, failed) in results.items():
+        print(
+            f"  {table:<8} {attempted:,} with missing values | ✅ {updated:,} updated | "
+            f"➖ {attempted - updated - failed:,} unchanged | ❌ {failed:,} failed"
+        )
+    print(f"  DB write time: {writer.seconds:.2f}s ({writer.rows:,} rows)")
+    return results
+
+
+def refresh_stale(con, sp, writer, cache, table, max_age_days, max_requests):
+    """
+    Refetch rows of `table` enriched more than `max_age_days` ago, most
+    listened first, in at most `max_requests` API calls, and re-derive every
+    registered column (popularity and followers are the ones that drift).
+    `sp` must be the uncached client, since cached objects are as old as the
+    rows; fresh objects are written back to `cache` when given.
+    Returns (stale, refreshed, failed, requests) counts.
+    """
+    if table == "tracks":
+        key, id_expr, ms_played_table, columns = (
+            "spotify_track_uri", "split_part(spotify_track_uri, ':', 3)", "track_ms_played", TRACK_COLUMNS
+        )
+        fetch = sp.tracks
+        make_row = track_row
+    else:
+        key, id_expr, ms_played_table, columns = "artist_name", "spotify_artist_id", "artist_ms_played", ARTIST_COLUMNS
+        fetch = sp.artists
+        make_row = artist_row
+
+    stale_filter = f"{id_expr} IS NOT NULL AND (enriched_at IS NULL OR enriched_at < ?)"
+    cutoff = datetime.now() - timedelta(days=max_age_days)
+    stale = con.execute(f"SELECT COUNT(*) FROM {table} WHERE {stale_filter}", [cutoff]).fetchone()[0]
+    if not stale or max_requests < 1:
+        return stale, 0, 0, 0
+
+    create_ms_played_tables(con)
+    print(f"\nRefreshing {table} older than {max_age_days:g} days ({stale:,} stale, up to {max_requests} requests)...")
+    rows = con.execute(f"""
+        SELECT t.{key}, {id_expr}
+        FROM {table} t
+        LEFT JOIN {ms_played_table} m ON m.id = t.{key}
+        WHERE {stale_filter}
+        ORDER BY COALESCE(m.ms_played, 0) DESC, t.enriched_at NULLS FIRST
+        LIMIT ?
+    """, [cutoff, max_requests * 50]).fetchall()
+
+    refreshed = 0
+    failed = 0
+    requests = 0
+    for spotify_ids, keys_by_id in id_batches(rows):
+        if requests == max_requests:
+            break
+        requests += 1
+        try:
+            objects = fetch(spotify_ids)[table]
+        except Exception as e:
+            print(f"  Error refreshing batch: {e}")
+            failed += sum(len(keys_by_id[spotify_id]) for spotify_id in spotify_ids)
+            continue
+        if cache:
+            cache.store(table, spotify_ids, objects)
+
+        values = []
+        for spotify_id, obj in zip(spotify_ids, objects):
+            if not obj:
+                # Left stale; a delisted item only costs one ID slot per run
+                failed += len(keys_by_id[spotify_id])
+                continue
+            values.extend(make_row(row_key, obj) for row_key in keys_by_id[spotify_id])
+        with writer.transaction():
+            writer.update(table, columns, values)
+            if table == "tracks":
+                save_albums(writer, objects)
+        refreshed += len(values)
+
+    return stale, refreshed, failed, requests
+
+
+def run_refresh(con, sp, writer, cache, budget, max_age_days):
+    """
+    Spend up to `budget` requests refreshing stale artists, then stale
+    tracks. Artists may use half the budget; tracks get whatever is left.
+    Returns {table: (stale, refreshed, failed, requests)}.
+    """
+    results = {}
+    results["artists"] = refresh_stale(con, sp, writer, cache, "artists", max_age_days, (budget + 1) // 2)
+    results["tracks"] = refresh_stale(
+        con, sp, writer, cache, "tracks", max_age_days, budget - results["artists"][3]
+    )
+    return results
+
+
+async def run_async_enrichment(con, args, cache, writer, metrics):
+    """Run track then artist enrichment on one shared AsyncSpotify session."""
+    # Imported here so the default (spotipy) mode doesn't require aiohttp
+    from api_cache import AsyncCachedSpotify
+    from spotify_async import AsyncSpotify
+    
+    client_id, client_secret = get_spotify_credentials()
+    async with AsyncSpotify(
+        client_id, client_secret, concurrency=args.concurrency, rate=args.rate, metrics=metrics
+    ) as client:
+        api = AsyncCachedSpotify(client, cache) if cache else client
+        track_counts = await enrich_tracks_async(con, api, writer)
+        artist_counts = await enrich_artists_async(con, api, writer)
+        feature_counts = (
+            await enrich_audio_features_async(con, api, writer) if args.audio_features else (0, 0, 0)
+        )
+    stats = client.stats
+    print(
+        f"\nAPI requests: {stats['requests']:,} "
+        f"({stats['retries']:,} retried, {stats['throttled']:,} rate-limited)"
+    )
+    return track_counts, artist_counts, feature_counts
+
+
+def save_run_metrics(con, metrics, writer, mode, cache, textfile, results):
+    """Record the run in enrichment_runs (and `textfile`, if given) and print its request stats."""
+    row = record_run(con, metrics, writer, mode, cache, results)
+    if row["api_calls"]:
+        print(
+            f"📡 API: {row['api_calls']:,} calls | latency p50 {row['latency_p50_ms']:.0f} ms, "
+            f"p95 {row['latency_p95_ms']:.0f} ms, p99 {row['latency_p99_ms']:.0f} ms | "
+            f"{row['retries']:,} retried ({row['throttled_429']:,} × 429, {row['server_errors_5xx']:,} × 5xx)"
+        )
+    if textfile:
+        write_textfile(textfile, metrics, row)
+        print(f"Metrics written to {textfile}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Keep several API requests in flight at once (requires aiohttp)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Max in-flight requests with --async (default: 8)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=10.0,
+        help="Max requests per second with --async, shared by all in-flight requests (default: 10)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the API instead of reusing responses from data/api_cache.sqlite3",
+    )
+    parser.add_argument(
+        "--cache-ttl-days",
+        type=float,
+        default=DEFAULT_TTL_DAYS,
+        help=f"Refetch cached responses older than this (default: {DEFAULT_TTL_DAYS})",
+    )
+    parser.add_argument(
+        "--retry-parked",
+        action="store_true",
+        help="Requeue jobs parked after repeated failures or 'not found' responses",
+    )
+    parser.add_argument(
+        "--no-audio-features",
+        dest="audio_features",
+        action="store_false",
+        help="Skip the audio features stage (the endpoint is unavailable to newer Spotify apps)",
+    )
+    parser.add_argument(
+        "--backfill",
+        nargs="*",
+        metavar="COLUMN",
+        help=(
+            "Instead of enriching new items, fill NULL registered columns of existing "
+            "rows from cached API objects (all registered columns if none are given)"
+        ),
+    )
+    parser.add_argument(
+        "--refresh-budget",
+        type=int,
+        default=REFRESH_BUDGET,
+        help=(
+            "Max API requests per run spent refetching stale tracks/artists, most listened "
+            f"first, to update popularity and followers (default: {REFRESH_BUDGET}; 0 disables)"
+        ),
+    )
+    parser.add_argument(
+        "--refresh-after-days",
+        type=float,
+        default=REFRESH_AFTER_DAYS,
+        help=f"Refresh rows enriched longer ago than this (default: {REFRESH_AFTER_DAYS})",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=Path,
+        metavar="PATH",
+        help=(
+            "Also write the run's request metrics (stored in the enrichment_runs table) "
+            "to PATH in Prometheus text format, e.g. for node_exporter's textfile collector"
+        ),
+    )
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.rate <= 0:
+        parser.error("--concurrency and --rate must be positive")
+    if args.refresh_budget < 0 or args.refresh_after_days < 0:
+        parser.error("--refresh-budget and --refresh-after-days can't be negative")
+    if args.backfill is not None and args.use_async:
+        parser.error("--backfill does not support --async")
+    registered = {column for fields in REGISTERED_TABLES.values() for column in fields}
+    unknown = set(args.backfill or []) - registered
+    if unknown:
+        parser.error(
+            f"unknown --backfill column(s) {', '.join(sorted(unknown))}; "
+            f"registered: {', '.join(sorted(registered))}"
+        )
+    
     print("Connecting to database...")
     con = duckdb.connect(str(DB_PATH))
+    ensure_registered_columns(con)
+    create_jobs_table(con)
+    if args.retry_parked:
+        print(f"Requeued {retry_parked_jobs(con):,} parked jobs")
+    cache = None if args.no_cache else ResponseCache(ttl_days=args.cache_ttl_days)
     
-    print("Initializing Spotify client...")
-    sp = get_spotify_client()
+    writer = BulkWriter(con)
+    metrics = RunMetrics()
+    
+    if args.backfill is not None:
+        print("Initializing Spotify client...")
+        sp = InstrumentedSpotify(get_spotify_client(), metrics)
+        if cache:
+            sp = CachedSpotify(sp, cache)
+        results = run_backfill(con, sp, writer, args.backfill)
+        if cache:
+            print(f"Response cache: {cache.hits:,} hits, {cache.misses:,} misses")
+            cache.prune()
+            cache.close()
+        save_run_metrics(con, metrics, writer, "backfill", cache, args.metrics_textfile, {
+            f"{table}_{key}": count
+            for table, counts in results.items()
+            for key, count in zip(("attempted", "updated", "failed"), counts)
+        })
+        con.close()
+        return
     
     # Run enrichment
-    track_attempted, track_enriched, track_failed = enrich_tracks(con, sp)
-    artist_attempted, artist_enriched, artist_not_found, artist_failed = enrich_artists(con, sp)
+    start_time = time.perf_counter()
+    if args.use_async:
+        print("Initializing async Spotify client...")
+        track_counts, artist_counts, feature_counts = asyncio.run(
+            run_async_enrichment(con, args, cache, writer, metrics)
+        )
+    else:
+        print("Initializing Spotify client...")
+        sp = InstrumentedSpotify(get_spotify_client(), metrics)
+        if cache:
+            sp = CachedSpotify(sp, cache)
+        track_counts = enrich_tracks(con, sp, writer)
+        artist_counts = enrich_artists(con, sp, writer)
+        feature_counts = enrich_audio_features(con, sp, writer) if args.audio_features else (0, 0, 0)
+    refresh_counts = None
+    if args.refresh_budget:
+        # Uncached client: cached objects are as stale as the rows being refreshed
+        refresh_counts = run_refresh(
+            con,
+            InstrumentedSpotify(get_spotify_client(), metrics),
+            writer,
+            cache,
+            args.refresh_budget,
+            args.refresh_after_days,
+        )
+    elapsed = time.perf_counter() - start_time
+    if cache:
+        expired, evicted = cache.prune()
+        print(
+            f"\nResponse cache: {cache.hits:,} hits, {cache.misses:,} misses, "
+            f"{cache.size_mb():.1f} MB ({expired:,} expired, {evicted:,} evicted)"
+        )
+        cache.close()
+    track_attempted, track_enriched, track_failed = track_counts
+    artist_attempted, artist_enriched, artist_not_found, artist_failed = artist_counts
+    feature_attempted, feature_enriched, feature_failed = feature_counts
     
     # Get total counts from database
     total_tracks_in_db = con.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
     total_artists_in_db = con.execute("SELECT COUNT(*) FROM artists").fetchone()[0]
     
-    # Get counts from plays table
-    total_unique_tracks = con.execute("""
-        SELECT COUNT(DISTINCT spotify_track_uri) 
-        FROM plays 
-        WHERE spotify_track_uri IS NOT NULL
-    """).fetchone()[0]
-    total_unique_artists = con.execute("SELECT COUNT(DISTINCT artist_name) FROM plays").fetchone()[0]
+    # Get counts from the distinct track/artist sets kept by ingest
+    total_unique_tracks = con.execute(
+        "SELECT COUNT(DISTINCT spotify_track_uri) FROM track_dim"
+    ).fetchone()[0]
+    total_unique_artists = con.execute("SELECT COUNT(*) FROM artist_dim").fetchone()[0]
     
     # Calculate missing
     missing_tracks = total_unique_tracks - total_tracks_in_db
@@ -251,6 +1309,24 @@ def main():
     print(f"  Total enriched in DB:      {total_artists_in_db:,}")
     print(f"  Still missing:             {missing_artists:,}")
     
+    if args.audio_features:
+        total_features_in_db = con.execute("SELECT COUNT(*) FROM audio_features").fetchone()[0]
+        print("\n🎚️  AUDIO FEATURES")
+        print("-" * 70)
+        print(f"  Attempted this run:        {feature_attempted:,}")
+        print(f"  ✅ Successfully enriched:  {feature_enriched:,}")
+        print(f"  ❌ Failed:                 {feature_failed:,}")
+        print(f"  Total enriched in DB:      {total_features_in_db:,}")
+    
+    if refresh_counts:
+        print(f"\n🔄 REFRESH (enriched over {args.refresh_after_days:g} days ago)")
+        print("-" * 70)
+        for table, (stale, refreshed, failed, requests) in refresh_counts.items():
+            print(
+                f"  {table:<8} {stale:,} stale | ✅ {refreshed:,} refreshed | ❌ {failed:,} failed | "
+                f"{requests}/{args.refresh_budget} requests"
+            )
+    
     print("\n" + "=" * 70)
     
     # Show coverage percentages
@@ -258,18 +1334,65 @@ def main():
     artist_coverage = (total_artists_in_db / total_unique_artists * 100) if total_unique_artists > 0 else 0
     
     print(f"📊 Coverage: Tracks {track_coverage:.1f}% | Artists {artist_coverage:.1f}%")
-    print("=" * 70)
     
-    # Show warnings if missing data
-    if missing_tracks > 0:
-        print(f"\n⚠️  {missing_tracks:,} tracks still need enrichment")
-        print("   Run the script again to process more tracks (limit: 10,000 per run)")
+    # Share of listening time whose track/artist is enriched, which is what the charts show
+    create_ms_played_tables(con)
+    listened_ms, track_ms, enriched_track_ms, enriched_artist_ms = con.execute("""
+        SELECT
+            (SELECT SUM(ms_played) FROM artist_ms_played),
+            (SELECT SUM(ms_played) FROM track_ms_played),
+            (SELECT SUM(m.ms_played) FROM track_ms_played m
+             WHERE EXISTS (SELECT 1 FROM tracks t WHERE t.spotify_track_uri = m.id)),
+            (SELECT SUM(m.ms_played) FROM artist_ms_played m
+             WHERE EXISTS (SELECT 1 FROM artists a WHERE a.artist_name = m.id))
+    """).fetchone()
+    track_hours_coverage = (enriched_track_ms or 0) / track_ms * 100 if track_ms else 0
+    artist_hours_coverage = (enriched_artist_ms or 0) / listened_ms * 100 if listened_ms else 0
+    print(
+        f"🎧 Hours coverage: Tracks {track_hours_coverage:.1f}% | Artists {artist_hours_coverage:.1f}% "
+        f"(of {(listened_ms or 0) / 3_600_000:,.0f} hours listened)"
+    )
+    print(
+        f"⏱️  Time: {elapsed:.1f}s total | API + processing {elapsed - writer.seconds:.1f}s | "
+        f"DB writes {writer.seconds:.2f}s ({writer.rows:,} rows)"
+    )
+    results = {
+        "tracks_attempted": track_attempted,
+        "tracks_enriched": track_enriched,
+        "tracks_failed": track_failed,
+        "artists_attempted": artist_attempted,
+        "artists_enriched": artist_enriched,
+        "artists_not_found": artist_not_found,
+        "artists_failed": artist_failed,
+        "audio_features_attempted": feature_attempted,
+        "audio_features_enriched": feature_enriched,
+        "audio_features_failed": feature_failed,
+    }
+    for table, (_, refreshed, failed, _) in (refresh_counts or {}).items():
+        results[f"{table}_refreshed"] = refreshed
+        results[f"{table}_refresh_failed"] = failed
+    save_run_metrics(
+        con, metrics, writer, "async" if args.use_async else "sync", cache, args.metrics_textfile, results
+    )
+    print("=" * 70)
     
-    if missing_artists > 0:
-        print(f"\n⚠️  {missing_artists:,} artists still need enrichment")
-        if artist_not_found > 0:
-            print(f"   ({artist_not_found:,} artists were not found on Spotify)")
-        print("   Run the script again to process more artists (limit: 5,000 per run)")
+    # Jobs left for a later run: failed batches waiting out their backoff, or parked
+    queue = dict(((entity, status), count) for entity, status, count in con.execute("""
+        SELECT entity, status, COUNT(*) FROM enrichment_jobs
+        WHERE status != 'done'
+        GROUP BY ALL
+    """).fetchall())
+    entities = [("track", "tracks"), ("artist", "artists")]
+    if args.audio_features:
+        entities.append(("audio_features", "audio features"))
+    for entity, label in entities:
+        retrying = queue.get((entity, "pending"), 0)
+        parked = queue.get((entity, "parked"), 0)
+        if retrying:
+            print(f"\n⚠️  {retrying:,} {label} still pending; retried on the next run (after any backoff)")
+        if parked:
+            print(f"\n⚠️  {parked:,} {label} parked (not found, rejected by the API, or failed {MAX_JOB_ATTEMPTS} times)")
+            print("   See enrichment_jobs.last_error; requeue with --retry-parked")
     
     con.close()
 
@@ -0,0 +1,243 @@
+"""
+Per-run request metrics for enrich_metadata.py.
+
+Every API call is timed where it leaves the process (after the response
+cache, so cache hits aren't counted), and every HTTP response is counted by
+status, including the 429s and 5xx that the clients retry on their own:
+
+  - spotipy: InstrumentedSpotify times each tracks()/artists()/... call
+    and a response hook on its requests session reads the statuses of
+    urllib3's retries from the final response
+  - AsyncSpotify: reports each attempt and each call from get()
+
+At the end of a run, record_run() stores one row in the enrichment_runs
+table (call counts per endpoint, latency percentiles, retries, status
+counts, rows written per second, network vs DuckDB write time), and
+write_textfile() optionally writes the same run in the Prometheus text
+format for node_exporter's textfile collector.
+"""
+
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sorted list."""
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+class RunMetrics:
+    """Request counters and latencies collected over one enrichment run."""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.latencies = defaultdict(list)  # endpoint -> seconds per call, retries included
+        self.errors = Counter()  # endpoint -> calls that raised
+        self.responses = Counter()  # HTTP status (or 'error' for connection failures) -> count
+        self.retries = 0
+
+    def observe_call(self, endpoint, seconds, ok=True):
+        """One API call as the caller saw it, however many attempts it took."""
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def observe_response(self, status, retried=False):
+        """One HTTP response (status None for a connection error or timeout)."""
+        self.responses[status or "error"] += 1
+        if retried:
+            self.retries += 1
+
+    def spotipy_hook(self, response, *args, **kwargs):
+        """requests response hook: count the final response and urllib3's retries before it."""
+        retries = getattr(response.raw, "retries", None)
+        for attempt in getattr(retries, "history", ()):
+            self.observe_response(attempt.status, retried=True)
+        self.observe_response(response.status_code)
+
+    def status_count(self, low, high):
+        return sum(count for status, count in self.responses.items() if status != "error" and low <= status < high)
+
+    def endpoint_stats(self):
+        """{endpoint: {calls, errors, p50_ms, p95_ms, p99_ms, max_ms}}."""
+        stats = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            stats[endpoint] = {
+                "calls": len(latencies),
+                "errors": self.errors[endpoint],
+                **{
+                    f"p{int(fraction * 100)}_ms": round(percentile(latencies, fraction) * 1000, 1)
+                    for fraction in (0.5, 0.95, 0.99)
+                },
+                "max_ms": round(latencies[-1] * 1000, 1),
+            }
+        return stats
+
+    def summary(self, writer):
+        """Run-level totals; `writer` is the run's BulkWriter."""
+        seconds = time.perf_counter() - self._start
+        latencies = sorted(value for values in self.latencies.values() for value in values)
+        return {
+            "started_at": self.started_at,
+            "seconds": round(seconds, 3),
+            "network_seconds": round(seconds - writer.seconds, 3),
+            "db_write_seconds": round(writer.seconds, 3),
+            "rows_written": writer.rows,
+            "rows_per_second": round(writer.rows / seconds, 1) if seconds else 0.0,
+            "api_calls": len(latencies),
+            "http_responses": sum(self.responses.values()),
+            "retries": self.retries,
+            "throttled_429": self.responses[429],
+            "server_errors_5xx": self.status_count(500, 600),
+            "client_errors_4xx": self.status_count(400, 500) - self.responses[429],
+            "connection_errors": self.responses["error"],
+            **{
+                f"latency_p{int(fraction * 100)}_ms": (
+                    round(percentile(latencies, fraction) * 1000, 1) if latencies else None
+                )
+                for fraction in (0.5, 0.95, 0.99)
+            },
+            "latency_max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+        }
+
+
+class InstrumentedSpotify:
+    """
+    Wraps a spotipy client so each tracks()/artists()/albums()/
+    audio_features() call is timed into `metrics`. Wrap it in CachedSpotify,
+    not the other way round, so only calls that reach the API are counted.
+    """
+
+    def __init__(self, sp, metrics):
+        self.sp = sp
+        self.metrics = metrics
+        sp._session.hooks["response"].append(metrics.spotipy_hook)
+
+    def _timed(self, endpoint, fetch, ids):
+        start = time.perf_counter()
+        try:
+            result = fetch(ids)
+        except Exception:
+            self.metrics.observe_call(endpoint, time.perf_counter() - start, ok=False)
+            raise
+        self.metrics.observe_call(endpoint, time.perf_counter() - start)
+        return result
+
+    def tracks(self, track_ids):
+        return self._timed("tracks", self.sp.tracks, track_ids)
+
+    def artists(self, artist_ids):
+        return self._timed("artists", self.sp.artists, artist_ids)
+
+    def albums(self, album_ids):
+        return self._timed("albums", self.sp.albums, album_ids)
+
+    def audio_features(self, track_ids):
+        return self._timed("audio-features", self.sp.audio_features, track_ids)
+
+    def __getattr__(self, name):
+        return getattr(self.sp, name)
+
+
+def create_runs_table(con):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS enrichment_runs (
+            started_at TIMESTAMP PRIMARY KEY,
+            mode TEXT,                     -- sync | async | backfill
+            seconds DOUBLE,
+            network_seconds DOUBLE,        -- everything but DuckDB writes: API calls, parsing
+            db_write_seconds DOUBLE,
+            rows_written BIGINT,
+            rows_per_second DOUBLE,
+            api_calls BIGINT,              -- calls that reached the API (cache hits excluded)
+            http_responses BIGINT,         -- every attempt, retries included
+            retries BIGINT,
+            throttled_429 BIGINT,
+            server_errors_5xx BIGINT,
+            client_errors_4xx BIGINT,
+            connection_errors BIGINT,
+            latency_p50_ms DOUBLE,         -- per call, retries included
+            latency_p95_ms DOUBLE,
+            latency_p99_ms DOUBLE,
+            latency_max_ms DOUBLE,
+            cache_hits BIGINT,
+            cache_misses BIGINT,
+            endpoints JSON,                -- {endpoint: {calls, errors, p50_ms, ...}}
+            results JSON                   -- stage counts, e.g. {"tracks_enriched": 120}
+        )
+    """)
+
+
+def record_run(con, metrics, writer, mode, cache=None, results=None):
+    """Store the run in enrichment_runs and return its summary dict."""
+    create_runs_table(con)
+    summary = metrics.summary(writer)
+    row = {
+        "mode": mode,
+        **summary,
+        "cache_hits": cache.hits if cache else None,
+        "cache_misses": cache.misses if cache else None,
+        "endpoints": json.dumps(metrics.endpoint_stats()),
+        "results": json.dumps(results or {}),
+    }
+    con.execute(
+        f"INSERT INTO enrichment_runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+        list(row.values()),
+    )
+    return row
+
+
+def sample(name, labels, value):
+    """One Prometheus sample line."""
+    label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+    return f"spotify_enrichment_{name}{{{label_text}}} {value}"
+
+
+def prometheus_lines(metrics, row):
+    """The run in the Prometheus text exposition format."""
+    mode = {"mode": row["mode"]}
+    gauges = [
+        ("last_run_timestamp_seconds", "Start of the last enrichment run.",
+         [(mode, row["started_at"].timestamp())]),
+        ("last_run_seconds", "Wall time of the last run by phase.",
+         [({**mode, "phase": "network"}, row["network_seconds"]),
+          ({**mode, "phase": "db_write"}, row["db_write_seconds"])]),
+        ("last_run_rows_written", "Rows written to DuckDB in the last run.", [(mode, row["rows_written"])]),
+        ("last_run_rows_per_second", "Rows written per second in the last run.", [(mode, row["rows_per_second"])]),
+        ("last_run_retries", "HTTP attempts retried in the last run.", [(mode, row["retries"])]),
+        ("last_run_http_responses", "HTTP responses in the last run by status.",
+         [({**mode, "status": status}, count) for status, count in sorted(metrics.responses.items(), key=str)]),
+    ]
+    lines = []
+    for name, help_text, samples in gauges:
+        lines.append(f"# HELP spotify_enrichment_{name} {help_text}")
+        lines.append(f"# TYPE spotify_enrichment_{name} gauge")
+        lines.extend(sample(name, labels, value) for labels, value in samples)
+
+    name = "last_run_request_duration_seconds"
+    lines.append(f"# HELP spotify_enrichment_{name} API call latency in the last run, retries included.")
+    lines.append(f"# TYPE spotify_enrichment_{name} histogram")
+    for endpoint, latencies in sorted(metrics.latencies.items()):
+        labels = {**mode, "endpoint": endpoint}
+        for bound in (*LATENCY_BUCKETS, "+Inf"):
+            count = len(latencies) if bound == "+Inf" else sum(1 for value in latencies if value <= bound)
+            lines.append(sample(f"{name}_bucket", {**labels, "le": bound}, count))
+        lines.append(sample(f"{name}_sum", labels, round(sum(latencies), 6)))
+        lines.append(sample(f"{name}_count", labels, len(latencies)))
+    return lines
+
+
+def write_textfile(path, metrics, row):
+    """Write the run for node_exporter's textfile collector (atomically, via rename)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(prometheus_lines(metrics, row)) + "\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Spotify Web API endpoints enrichment uses.
+
+Serves the client-credentials token endpoint and the several-tracks,
+several-artists, several-albums and audio-features endpoints (plus single
+track/artist/album),
+so enrich_metadata.py and backfill_images.py can be load-tested and
+regression-tested offline. Point the scripts at it with:
+
+    export SPOTIFY_API_URL=http://localhost:8765/v1
+    export SPOTIFY_TOKEN_URL=http://localhost:8765/api/token
+
+Any SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET values are accepted.
+
+The catalog comes from:
+  - a DuckDB database (--db, default data/spotify.duckdb): every URI in
+    track_dim becomes a track whose name, album and primary artist match the
+    plays; other fields (popularity, release date, genres, audio features)
+    are made up deterministically from the ID
+  - recorded responses (--replay data/api_cache.sqlite3): objects a real
+    enrichment run stored in the response cache are served verbatim,
+    taking precedence over the database catalog
+
+Like the real API, unknown IDs come back as null, malformed IDs and
+oversized batches get a 400, and requests need a current access token.
+Latency, 5xx errors and 429s can be injected, and GET /_stats reports what
+the server saw.
+
+Usage:
+    python scripts/fake_spotify_server.py --db data/benchmark/100000/spotify.duckdb
+    python scripts/fake_spotify_server.py --latency-ms 80 --error-rate 0.02 --max-rps 20
+"""
+
+import argparse
+import json
+import random
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import duckdb
+
+from generate_synthetic_history import artist_genres, spotify_id
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DB_PATH = DATA_DIR / "spotify.duckdb"
+
+DEFAULT_PORT = 8765
+TOKEN_TTL_SECONDS = 3600
+BASE62_ID = re.compile(r"^[0-9A-Za-z]{22}$")
+
+# Endpoint -> max IDs per request, as documented by Spotify
+BATCH_LIMITS = {"tracks": 50, "artists": 50, "albums": 20, "audio-features": 100}
+
+
+def image_set(seed):
+    """The three sizes Spotify returns for album and artist images."""
+    return [
+        {"url": f"https://i.scdn.co/image/{seed}{size}", "height": size, "width": size}
+        for size in (640, 300, 64)
+    ]
+
+
+def album_id(artist_id, album_name):
+    """Stable album ID: one album per (primary artist, album name) in the plays."""
+    return spotify_id("album", f"{artist_id}:{album_name}")
+
+
+class Catalog:
+    """Track, artist, album and audio features objects by Spotify ID."""
+
+    def __init__(self, db_path=None, replay_path=None, missing_rate=0.0):
+        self.tracks = {}  # track ID -> (name, album, artist ID)
+        self.artists = {}  # artist ID -> (name, artist_dim ID)
+        self.albums = {}  # album ID -> (name, artist ID, track IDs)
+        self.recorded = {"tracks": {}, "artists": {}, "albums": {}, "audio-features": {}}
+        self.missing_rate = missing_rate
+        if db_path:
+            self._load_db(db_path)
+        if replay_path:
+            self._load_replay(replay_path)
+
+    def _load_db(self, db_path):
+        con = duckdb.connect(str(db_path), read_only=True)
+        rows = con.execute(
+            """
+            SELECT DISTINCT ON (d.spotify_track_uri)
+                split_part(d.spotify_track_uri, ':', 3), d.track_name, d.album_name,
+                a.artist_id, a.artist_name
+            FROM track_dim d
+            JOIN artist_dim a ON a.artist_id = d.artist_id
+            WHERE d.spotify_track_uri IS NOT NULL
+        """
+        ).fetchall()
+        con.close()
+        for track_id, track_name, album_name, artist_index, artist_name in rows:
+            artist_id = spotify_id("artist", artist_index)
+            self.tracks[track_id] = (track_name, album_name, artist_id)
+            self.artists[artist_id] = (artist_name, artist_index)
+            album = self.albums.setdefault(album_id(artist_id, album_name), (album_name, artist_id, []))
+            album[2].append(track_id)
+
+    def _load_replay(self, replay_path):
+        con = sqlite3.connect(str(replay_path))
+        for endpoint, object_id, payload in con.execute("SELECT endpoint, spotify_id, payload FROM responses"):
+            endpoint = endpoint.replace("_", "-")
+            if endpoint in self.recorded:
+                self.recorded[endpoint][object_id] = json.loads(zlib.decompress(payload))
+        con.close()
+
+    def _missing(self, object_id):
+        """Deterministically drop a --missing-rate share of IDs, like delisted items."""
+        return self.missing_rate and random.Random(f"missing:{object_id}").random() < self.missing_rate
+
+    def get(self, endpoint, object_id):
+        """API object for an ID, or None if the catalog doesn't have it."""
+        if self._missing(object_id):
+            return None
+        if object_id in self.recorded[endpoint]:
+            return self.recorded[endpoint][object_id]
+        if endpoint == "tracks":
+            return self.track(object_id)
+        if endpoint == "artists":
+            return self.artist(object_id)
+        if endpoint == "albums":
+            return self.album(object_id)
+        return self.audio_features(object_id)
+
+    def track(self, track_id):
+        if track_id not in self.tracks:
+            return None
+        name, album, artist_id = self.tracks[track_id]
+        rng = random.Random(f"track:{track_id}")
+        return {
+            "id": track_id,
+            "uri": f"spotify:track:{track_id}",
+            "name": name,
+            "artists": [
+                {"id": artist_id, "name": self.artists[artist_id][0], "uri": f"spotify:artist:{artist_id}"}
+            ],
+            "album": self.simplified_album(album_id(artist_id, album)),
+            "popularity": rng.randint(0, 100),
+            "duration_ms": rng.randint(90_000, 420_000),
+            "explicit": rng.random() < 0.15,
+            "external_ids": {"isrc": f"QZ{rng.randint(0, 10**10 - 1):010d}"},
+        }
+
+    def simplified_album(self, album_id):
+        """The album fields embedded in a track object."""
+        name, artist_id, _ = self.albums[album_id]
+        rng = random.Random(f"album:{album_id}")
+        year = 2025 - min(int(rng.expovariate(1 / 12)), 70)
+        return {
+            "id": album_id,
+            "uri": f"spotify:album:{album_id}",
+            "name": name,
+            "release_date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "release_date_precision": "day",
+            "images": image_set(album_id) if rng.random() < 0.97 else [],
+        }
+
+    def album(self, album_id):
+        if album_id not in self.albums:
+            return None
+        _, artist_id, track_ids = self.albums[album_id]
+        return {
+            **self.simplified_album(album_id),
+            # Full album objects always carry their artwork
+            "images": image_set(album_id),
+            "artists": [
+                {"id": artist_id, "name": self.artists[artist_id][0], "uri": f"spotify:artist:{artist_id}"}
+            ],
+            "total_tracks": len(track_ids),
+            "tracks": {"items": [{"id": track_id, "uri": f"spotify:track:{track_id}"} for track_id in track_ids]},
+        }
+
+    def artist(self, artist_id):
+        if artist_id not in self.artists:
+            return None
+        name, artist_index = self.artists[artist_id]
+        rng = random.Random(f"artist:{artist_id}")
+        return {
+            "id": artist_id,
+            "uri": f"spotify:artist:{artist_id}",
+            "name": name,
+            "genres": artist_genres(artist_index),
+            "popularity": rng.randint(0, 100),
+            "followers": {"total": int(rng.paretovariate(0.8) * 100)},
+            "images": image_set(artist_id) if rng.random() < 0.9 else [],
+        }
+
+    def audio_features(self, track_id):
+        if track_id not in self.tracks:
+            return None
+        rng = random.Random(f"features:{track_id}")
+        return {
+            "id": track_id,
+            "uri": f"spotify:track:{track_id}",
+            "danceability": round(rng.random(), 3),
+            "energy": round(rng.random(), 3),
+            "valence": round(rng.random(), 3),
+            "tempo": round(rng.uniform(60, 200), 3),
+            "acousticness": round(rng.random(), 4),
+            "instrumentalness": round(rng.random() ** 4, 4),
+            "speechiness": round(rng.random() ** 3, 4),
+            "loudness": round(rng.uniform(-30, 0), 3),
+            "key": rng.randint(0, 11),
+            "mode": rng.randint(0, 1),
+            "time_signature": rng.choice([3, 4, 4, 4, 5]),
+            "duration_ms": self.track(track_id)["duration_ms"],
+        }
+
+
+class FakeSpotify:
+    """Shared server state: catalog, issued tokens, fault injection and stats."""
+
+    def __init__(self, catalog, args):
+        self.catalog = catalog
+        self.args = args
+        self.tokens = {}  # access token -> expiry (monotonic seconds)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.window = []  # Start times of recent requests, for --max-rps
+        self.stats = Counter()
+        self.inflight = 0
+
+    def issue_token(self):
+        token = secrets.token_urlsafe(24)
+        with self.lock:
+            self.tokens[token] = time.monotonic() + self.args.token_ttl
+        return token
+
+    def token_valid(self, header):
+        token = header[len("Bearer "):] if header and header.startswith("Bearer ") else None
+        with self.lock:
+            return token in self.tokens and self.tokens[token] > time.monotonic()
+
+    def inject_fault(self):
+        """(status, Retry-After) to fail this request with, or None to serve it."""
+        with self.lock:
+            now = time.monotonic()
+            if self.args.max_rps:
+                self.window = [t for t in self.window if t > now - 1]
+                if len(self.window) >= self.args.max_rps:
+                    return 429, 1
+                self.window.append(now)
+            roll = self.rng.random()
+        if roll < self.args.rate_limit_rate:
+            return 429, self.args.retry_after
+        if roll < self.args.rate_limit_rate + self.args.error_rate:
+            return self.rng.choice([500, 502, 503]), None
+        return None
+
+    def latency(self):
+        with self.lock:
+            jitter = self.rng.uniform(-self.args.jitter_ms, self.args.jitter_ms)
+        return max(self.args.latency_ms + jitter, 0) / 1000
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, "inflight": self.inflight}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "FakeSpotify/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def log_message(self, format, *args):
+        if self.fake.args.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+        with self.fake.lock:
+            self.fake.stats[f"status_{status}"] += 1
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {"error": {"status": status, "message": message}}, headers)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if urlsplit(self.path).path.rstrip("/") != "/api/token":
+            self.send_error_json(404, "Service not found")
+            return
+        with self.fake.lock:
+            self.fake.stats["token_requests"] += 1
+        self.send_json(
+            200,
+            {"access_token": self.fake.issue_token(), "token_type": "Bearer", "expires_in": self.fake.args.token_ttl},
+        )
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        if path == "/_stats":
+            self.send_json(200, self.fake.snapshot())
+            return
+
+        match = re.fullmatch(r"/v1/(tracks|artists|albums|audio-features)(?:/([^/]+))?", path)
+        if not match:
+            self.send_error_json(404, "Service not found")
+            return
+        endpoint, single_id = match.groups()
+
+        with self.fake.lock:
+            self.fake.stats["requests"] += 1
+            self.fake.stats[f"requests_{endpoint}"] += 1
+            self.fake.inflight += 1
+            self.fake.stats["max_inflight"] = max(self.fake.stats["max_inflight"], self.fake.inflight)
+        try:
+            time.sleep(self.fake.latency())
+            self.serve(endpoint, single_id, parse_qs(url.query))
+        finally:
+            with self.fake.lock:
+                self.fake.inflight -= 1
+
+    def serve(self, endpoint, single_id, query):
+        if not self.fake.token_valid(self.headers.get("Authorization")):
+            self.send_error_json(401, "The access token expired")
+            return
+        fault = self.fake.inject_fault()
+        if fault:
+            status, retry_after = fault
+            headers = {"Retry-After": retry_after} if retry_after is not None else None
+            self.send_error_json(status, "API rate limit exceeded" if status == 429 else "Server error", headers)
+            return
+
+        ids = [single_id] if single_id else ",".join(query.get("ids", [])).split(",")
+        if not ids or ids == [""]:
+            self.send_error_json(400, "invalid request")
+            return
+        if len(ids) > BATCH_LIMITS[endpoint]:
+            self.send_error_json(400, "Too many ids requested")
+            return
+        if not all(BASE62_ID.match(object_id) for object_id in ids):
+            self.send_error_json(400, "invalid base62 id" if single_id else "invalid id")
+            return
+
+        objects = [self.fake.catalog.get(endpoint, object_id) for object_id in ids]
+        with self.fake.lock:
+            self.fake.stats["ids_served"] += len(ids)
+            self.fake.stats["ids_not_found"] += objects.count(None)
+        if single_id:
+            if objects[0] is None:
+                self.send_error_json(404, "Resource not found")
+            else:
+                self.send_json(200, objects[0])
+        else:
+            self.send_json(200, {endpoint.replace("-", "_"): objects})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="DuckDB file whose track_dim/artist_dim seed the catalog")
+    parser.add_argument("--replay", type=Path, help="Response cache (api_cache.sqlite3) whose recorded objects are served as-is")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Mean response latency (default: 50)")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Uniform +/- latency jitter (default: 20)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 500/502/503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests failing with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with injected 429s (default: 1)")
+    parser.add_argument("--max-rps", type=int, default=0, help="Answer 429 above this many requests per second (0: no limit)")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="Share of IDs returned as null (not found)")
+    parser.add_argument("--token-ttl", type=int, default=TOKEN_TTL_SECONDS, help="Access token lifetime in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and fault injection")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    if not args.db.exists() and not args.replay:
+        parser.error(f"{args.db} not found; pass --db or --replay to seed the catalog")
+
+    print("Loading catalog...")
+    catalog = Catalog(args.db if args.db.exists() else None, args.replay, args.missing_rate)
+    recorded = sum(len(objects) for objects in catalog.recorded.values())
+    print(f"  {len(catalog.tracks):,} tracks, {len(catalog.artists):,} artists, {recorded:,} recorded objects")
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeSpotify(catalog, args)
+    print(f"Serving on http://127.0.0.1:{args.port}")
+    print(f"  export SPOTIFY_API_URL=http://127.0.0.1:{args.port}/v1")
+    print(f"  export SPOTIFY_TOKEN_URL=http://127.0.0.1:{args.port}/api/token")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nStats: {json.dumps(server.fake.snapshot())}")
+
+
+if __name__ == "__main__":
+    main()
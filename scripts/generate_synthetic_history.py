@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic Spotify extended streaming history for benchmarking.
+
+Writes Streaming_History_Audio_*.json files shaped like a real export
+(same keys, file naming and ~15k plays per file) so the whole pipeline can
+be measured at sizes no single real account reaches (100k to 50M plays).
+
+The history is deliberately messy in the ways real exports are:
+  - track and artist popularity follow a Zipf distribution
+  - about a quarter of plays are skips shorter than MIN_PLAY_DURATION_MS
+  - a burst of plays straddles every DST transition of LOCAL_TIMEZONE
+  - some plays are local files (no URI) or podcast episodes (no track metadata)
+
+Output is deterministic for a given --seed. A synthetic_artists.csv with
+made-up genres per artist is written alongside, so seed_genre_mappings.py
+has something to categorize without calling the Spotify API. It also marks
+the directory as generated: export files are only replaced in a directory
+that has it (or with --force), never in a real export folder.
+
+Usage:
+    python scripts/generate_synthetic_history.py --plays 1000000 --out data/synthetic
+"""
+
+import argparse
+import csv
+import json
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import accumulate
+from pathlib import Path
+
+from ingest_spotify import LOCAL_TIMEZONE, MIN_PLAY_DURATION_MS, zone_segments
+
+DEFAULT_OUT_DIR = Path(__file__).parent.parent / "data" / "synthetic"
+ARTISTS_CSV = "synthetic_artists.csv"  # Written last; marks a directory as generated
+
+PLAYS_PER_FILE = 15000  # Roughly what Spotify puts in each export file
+TRACK_CACHE_SIZE = 200_000  # Zipf skew means most plays hit a cached track
+ZIPF_EXPONENT = 1.07
+
+SKIP_RATE = 0.25
+LOCAL_FILE_RATE = 0.005  # Track names present, no spotify_track_uri
+EPISODE_RATE = 0.003  # Podcast episodes, all master_metadata_* fields null
+DST_BURST_SECONDS = 3600  # Burst covers 30 minutes either side of a transition
+DST_BURST_GAP_SECONDS = 210
+
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+WORDS = [
+    "Midnight", "Golden", "River", "Echo", "Summer", "Neon", "Ghost", "Velvet",
+    "Paper", "Electric", "Silver", "Wild", "Heart", "Ocean", "Fire", "Dream",
+    "City", "Lights", "Stone", "Sky", "Blue", "Shadow", "Honey", "Desert",
+    "Café", "Niño", "Über", "Déjà Vu", "Señorita", "Tokyo", "Zürich", "Noël",
+    "Don't", "Rock 'n' Roll", "\"Live\"", "(Remix)", "- Remastered", "&", "Pt. II",
+]
+
+GENRE_PREFIXES = [
+    "", "", "", "indie ", "canadian ", "modern ", "alternative ", "uk ",
+    "deep ", "dark ", "melodic ", "chamber ", "german ", "latin ", "classic ",
+]
+GENRE_BASES = [
+    "rock", "pop", "hip hop", "house", "techno", "jazz", "folk", "metal",
+    "r&b", "soul", "trap", "punk", "country", "ambient", "blues", "reggae",
+    "funk", "disco", "emo", "shoegaze", "drill", "bossa nova", "k-pop",
+    "lo-fi beats", "singer-songwriter", "edm", "dubstep", "gospel",
+    "soundtrack", "classical", "afrobeats", "new wave", "synthwave",
+]
+GENRES = sorted({f"{prefix}{base}" for prefix in GENRE_PREFIXES for base in GENRE_BASES})
+
+PLATFORMS = ["android", "ios", "osx", "windows", "web_player", "cast_to_device"]
+COUNTRIES = ["CA", "CA", "CA", "CA", "US", "US", "GB", "FR", "MX"]
+
+
+def zipf_cum_weights(n):
+    """Cumulative Zipf weights for ranks 1..n, for random.choices()."""
+    return list(accumulate(1 / (rank**ZIPF_EXPONENT) for rank in range(1, n + 1)))
+
+
+def words_for(kind, index, count):
+    """Deterministic multi-word name for entity `index` (no stored state)."""
+    rng = random.Random(f"{kind}:{index}")
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def spotify_id(kind, index):
+    """Deterministic 22-character base62 ID, like Spotify's."""
+    value = random.Random(f"{kind}-id:{index}").getrandbits(131)
+    chars = []
+    for _ in range(22):
+        value, digit = divmod(value, 62)
+        chars.append(BASE62[digit])
+    return "".join(chars)
+
+
+def artist_name(index):
+    return f"{words_for('artist', index, 2)} {index}"
+
+
+def artist_genres(index):
+    """0-4 made-up genres, skewed towards the common ones like real data."""
+    rng = random.Random(f"genres:{index}")
+    count = rng.choice([0, 1, 2, 2, 3, 3, 4])
+    return sorted({GENRES[min(int(rng.paretovariate(1.2)) - 1, len(GENRES) - 1)] for _ in range(count)})
+
+
+class Catalog:
+    """Tracks, each with a fixed artist, album and duration derived from its index."""
+
+    def __init__(self, n_tracks, n_artists, seed):
+        self.n_tracks = n_tracks
+        self.n_artists = n_artists
+        self.track_weights = zipf_cum_weights(n_tracks)
+        self.artist_weights = zipf_cum_weights(n_artists)
+        self.seed = seed
+        self.track = lru_cache(maxsize=TRACK_CACHE_SIZE)(self._track)
+
+    def _track(self, index):
+        rng = random.Random(f"{self.seed}:track:{index}")
+        # Popular tracks tend to belong to popular artists
+        artist = bisect_left(self.artist_weights, rng.random() * self.artist_weights[-1])
+        album = rng.randint(0, 9)
+        return {
+            "name": words_for("track", index, rng.randint(1, 4)),
+            "artist": artist_name(artist),
+            "album": f"{words_for('album', artist * 10 + album, 2)} {album}",
+            "uri": f"spotify:track:{spotify_id('track', index)}",
+            "duration_ms": rng.randint(90_000, 420_000),
+        }
+
+
+def dst_transitions(start, end):
+    """UTC epoch seconds of every LOCAL_TIMEZONE offset change in [start, end)."""
+    segments = zone_segments(LOCAL_TIMEZONE, start.replace(tzinfo=None), end.replace(tzinfo=None))
+    return [seg_end.replace(tzinfo=timezone.utc).timestamp() for _, seg_end, _ in segments[:-1]]
+
+
+def iter_timestamps(rng, start, end, n_plays):
+    """
+    Yield n_plays increasing UTC epoch seconds spread over [start, end), with
+    a dense burst of plays across each DST transition.
+    """
+    start_ts, end_ts = start.timestamp(), end.timestamp()
+    transitions = dst_transitions(start, end)
+    burst_plays = len(transitions) * (DST_BURST_SECONDS // DST_BURST_GAP_SECONDS + 1)
+    spread_seconds = end_ts - start_ts - len(transitions) * DST_BURST_SECONDS
+    step = spread_seconds / max(n_plays - burst_plays, 1)
+
+    t = start_ts
+    produced = 0
+    next_transition = 0
+    while produced < n_plays:
+        # Start the burst as soon as the next spread-out play could overlap it
+        if next_transition < len(transitions) and t + step > transitions[next_transition] - DST_BURST_SECONDS / 2:
+            burst_t = max(t, transitions[next_transition] - DST_BURST_SECONDS / 2)
+            burst_end = transitions[next_transition] + DST_BURST_SECONDS / 2
+            while burst_t < burst_end and produced < n_plays:
+                yield burst_t
+                produced += 1
+                burst_t += DST_BURST_GAP_SECONDS
+            t = burst_t
+            next_transition += 1
+            continue
+        yield t + rng.random() * step
+        produced += 1
+        t += step
+
+
+def make_play(rng, ts, catalog):
+    """One export record in Spotify's field order."""
+    play = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)),
+        "platform": rng.choice(PLATFORMS),
+        "ms_played": 0,
+        "conn_country": rng.choice(COUNTRIES),
+        "ip_addr": f"10.0.{rng.getrandbits(8)}.{rng.getrandbits(8)}",
+        "master_metadata_track_name": None,
+        "master_metadata_album_artist_name": None,
+        "master_metadata_album_album_name": None,
+        "spotify_track_uri": None,
+        "episode_name": None,
+        "episode_show_name": None,
+        "spotify_episode_uri": None,
+        "audiobook_title": None,
+        "audiobook_uri": None,
+        "audiobook_chapter_uri": None,
+        "audiobook_chapter_title": None,
+        "reason_start": "trackdone",
+        "reason_end": "trackdone",
+        "shuffle": rng.random() < 0.4,
+        "skipped": False,
+        "offline": False,
+        "offline_timestamp": int(ts),
+        "incognito_mode": False,
+    }
+
+    kind = rng.random()
+    if kind < EPISODE_RATE:
+        episode = rng.randint(0, 999)
+        play["episode_name"] = words_for("episode", episode, 5)
+        play["episode_show_name"] = words_for("show", episode % 20, 2)
+        play["spotify_episode_uri"] = f"spotify:episode:{spotify_id('episode', episode)}"
+        duration_ms = rng.randint(600_000, 5_400_000)
+    else:
+        index = bisect_left(catalog.track_weights, rng.random() * catalog.track_weights[-1])
+        track = catalog.track(index)
+        play["master_metadata_track_name"] = track["name"]
+        play["master_metadata_album_artist_name"] = track["artist"]
+        play["master_metadata_album_album_name"] = track["album"]
+        if kind >= EPISODE_RATE + LOCAL_FILE_RATE:
+            play["spotify_track_uri"] = track["uri"]
+        duration_ms = track["duration_ms"]
+
+    if rng.random() < SKIP_RATE:
+        play["ms_played"] = rng.randint(0, MIN_PLAY_DURATION_MS - 1)
+        play["reason_end"] = "fwdbtn"
+        play["skipped"] = True
+    elif rng.random() < 0.8:
+        play["ms_played"] = duration_ms
+    else:
+        play["ms_played"] = rng.randint(MIN_PLAY_DURATION_MS, max(duration_ms, MIN_PLAY_DURATION_MS))
+        play["reason_end"] = rng.choice(["endplay", "logout", "unexpected-exit"])
+    return play
+
+
+def write_export_file(out_dir, index, plays):
+    """Write one file, named by the years it covers like Spotify does."""
+    first_year, last_year = plays[0]["ts"][:4], plays[-1]["ts"][:4]
+    years = first_year if first_year == last_year else f"{first_year}-{last_year}"
+    path = out_dir / f"Streaming_History_Audio_{years}_{index}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        f.write(",\n".join(json.dumps(play, ensure_ascii=False) for play in plays))
+        f.write("\n]\n")
+    return path
+
+
+def write_artists_csv(out_dir, n_artists):
+    """Made-up genres per artist, for seeding genre_mappings without the API."""
+    path = out_dir / ARTISTS_CSV
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["artist_name", "genres"])
+        for index in range(n_artists):
+            writer.writerow([artist_name(index), ",".join(artist_genres(index))])
+    return path
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--plays", type=int, default=100_000, help="Total plays to generate")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT_DIR, help="Output directory")
+    parser.add_argument(
+        "--tracks",
+        type=int,
+        help="Distinct tracks (default: plays / 8, between 1,000 and 500,000)",
+    )
+    parser.add_argument("--artists", type=int, help="Distinct artists (default: tracks / 6)")
+    parser.add_argument("--start", type=parse_date, default=parse_date("2016-01-01"), help="First day (UTC)")
+    parser.add_argument("--end", type=parse_date, default=parse_date("2025-01-01"), help="Day after the last (UTC)")
+    parser.add_argument("--plays-per-file", type=int, default=PLAYS_PER_FILE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=f"Write into a non-empty --out without {ARTISTS_CSV} from an earlier run, "
+        "replacing any export files in it",
+    )
+    args = parser.parse_args()
+
+    if args.plays < 1 or args.end <= args.start:
+        parser.error("--plays must be positive and --end after --start")
+    n_tracks = args.tracks or min(max(args.plays // 8, 1000), 500_000)
+    n_artists = args.artists or max(n_tracks // 6, 10)
+
+    # Never delete files this script can't prove it wrote, e.g. a mistyped
+    # --out data_raw holding a real export
+    if args.out.is_dir() and any(args.out.iterdir()) and not (args.out / ARTISTS_CSV).exists() and not args.force:
+        parser.error(
+            f"{args.out} is not empty and has no {ARTISTS_CSV} from an earlier run; "
+            "pick an empty directory or pass --force to replace its export files"
+        )
+    args.out.mkdir(parents=True, exist_ok=True)
+    for path in args.out.glob("Streaming_History_Audio_*.json"):
+        path.unlink()
+
+    print(f"Generating {args.plays:,} plays ({n_tracks:,} tracks, {n_artists:,} artists) into {args.out}")
+    start_time = time.perf_counter()
+    rng = random.Random(args.seed)
+    catalog = Catalog(n_tracks, n_artists, args.seed)
+
+    files = 0
+    total_bytes = 0
+    skips = 0
+    batch = []
+    for ts in iter_timestamps(rng, args.start, args.end, args.plays):
+        play = make_play(rng, ts, catalog)
+        skips += play["skipped"]
+        batch.append(play)
+        if len(batch) == args.plays_per_file:
+            total_bytes += write_export_file(args.out, files, batch).stat().st_size
+            files += 1
+            batch = []
+            if files % 20 == 0:
+                print(f"  {files * args.plays_per_file:,}/{args.plays:,} plays", flush=True)
+    if batch:
+        total_bytes += write_export_file(args.out, files, batch).stat().st_size
+        files += 1
+
+    write_artists_csv(args.out, n_artists)
+    elapsed = time.perf_counter() - start_time
+
+    print("\n" + "=" * 60)
+    print("SYNTHETIC HISTORY GENERATED")
+    print("=" * 60)
+    print(f"Plays:        {args.plays:,} ({skips:,} skips < {MIN_PLAY_DURATION_MS // 1000}s)")
+    print(f"Files:        {files:,} ({total_bytes / 1024**2:,.1f} MB)")
+    print(f"DST bursts:   {len(dst_transitions(args.start, args.end))} transitions in {LOCAL_TIMEZONE.key}")
+    print(f"Time:         {elapsed:.1f}s ({args.plays / elapsed:,.0f} plays/s)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,51 @@
 """
 Ingest Spotify extended streaming history JSON files into DuckDB.
 
-Reads all Streaming_History_Audio_*.json files from data_raw/
-and creates a normalized 'plays' table in data/spotify.duckdb.
+Reads all Streaming_History_Audio_*.json files from data_raw/ (or directly
+from the Spotify export ZIP with --zip) and creates a normalized 'plays'
+view in data/spotify.duckdb.
+
+Plays are stored dictionary-encoded: play_facts holds integer track/artist
+IDs that reference track_dim and artist_dim, and the 'plays' view joins
+them back into the original denormalized columns for the API routes and
+the Postgres sync.
+
+By default all play tables are rebuilt from scratch. With --incremental,
+files already recorded in the ingest_manifest table are skipped and only
+new plays from new or changed files are appended.
+
+Two ingest engines produce identical rows:
+  --engine python  streams each file through a Python JSON reader (default)
+  --engine sql     reads each file with DuckDB's JSON scanner and does all
+                   filtering and timezone conversion in one SQL statement
+Use --validate to compare both engines row-for-row without modifying plays.
 """
 
+import argparse
+import csv
+import fnmatch
+import hashlib
+import io
 import json
+import re
+import sys
+import time
+import zipfile
 import duckdb
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 # Paths
 DATA_RAW_DIR = Path(__file__).parent.parent / "data_raw"
 DATA_DIR = Path(__file__).parent.parent / "data"
@@ -21,40 +56,906 @@ DB_PATH = DATA_DIR / "spotify.duckdb"
 # Spotify timestamps are in UTC, convert to local timezone
 LOCAL_TIMEZONE = ZoneInfo("America/Toronto")  # EST/EDT (automatically handles DST)
 
+# Optional travel periods overriding LOCAL_TIMEZONE, one per line:
+#   start,end,timezone
+#   2019-06-01,2019-06-15,Europe/Paris
+# start is inclusive and end exclusive; both are UTC dates or datetimes
+TRAVEL_PERIODS_PATH = DATA_RAW_DIR / "timezones.csv"
+
+# UTC range covered by the tz_offsets table
+TZ_TABLE_START = datetime(1970, 1, 1)
+TZ_TABLE_END = datetime(2100, 1, 1)
+
 # Data quality filter
 # Skip plays shorter than this duration (Spotify royalty standard)
 MIN_PLAY_DURATION_MS = 30000  # 30 seconds
 
+# Streaming configuration
+# Export files are read incrementally and flushed to DuckDB in chunks,
+# so peak memory depends on these sizes rather than on the file size
+READ_CHUNK_CHARS = 1 << 16  # 64K characters per read
+INSERT_CHUNK_ROWS = 10000  # rows per executemany flush
+
+
+def utc_offset(tz, at):
+    """UTC offset of `tz` at the naive UTC datetime `at`."""
+    return at.replace(tzinfo=timezone.utc).astimezone(tz).utcoffset()
+
+
+def zone_segments(tz, start, end):
+    """
+    Split [start, end) (naive UTC) into (valid_from, valid_to, utc_offset)
+    segments of constant offset for `tz`.
+
+    Scans day by day and bisects each offset change down to the second,
+    which finds every DST (or other) transition without relying on
+    zoneinfo internals.
+    """
+    segments = []
+    segment_start = start
+    offset = utc_offset(tz, start)
+    t = start
+    while t < end:
+        step = min(t + timedelta(days=1), end)
+        if utc_offset(tz, step) == offset or step == end:
+            t = step
+            continue
+        # First second at which the new offset applies lies in (t, step]
+        lo, hi = t, step
+        while hi - lo > timedelta(seconds=1):
+            mid = lo + (hi - lo) / 2
+            mid = mid.replace(microsecond=0)
+            if utc_offset(tz, mid) == offset:
+                lo = mid
+            else:
+                hi = mid
+        segments.append((segment_start, hi, offset))
+        segment_start = hi
+        offset = utc_offset(tz, hi)
+        t = hi
+    segments.append((segment_start, end, offset))
+    return segments
+
+
+def load_travel_periods(path):
+    """Read (start, end, ZoneInfo) travel periods from a CSV file, if present."""
+    if not path.exists():
+        return []
+    periods = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            start = datetime.fromisoformat(row["start"].strip())
+            end = datetime.fromisoformat(row["end"].strip())
+            if end <= start:
+                raise ValueError(f"Travel period ends before it starts: {row}")
+            periods.append((start, end, ZoneInfo(row["timezone"].strip())))
+    return periods
+
+
+def build_tz_offsets(home_tz, travel_periods):
+    """
+    Build non-overlapping (valid_from, valid_to, utc_offset, timezone) rows
+    covering TZ_TABLE_START..TZ_TABLE_END in UTC.
+
+    The home timezone applies everywhere except inside travel periods;
+    later travel periods win where periods overlap.
+    """
+    rows = [
+        (f, t, offset, home_tz.key)
+        for f, t, offset in zone_segments(home_tz, TZ_TABLE_START, TZ_TABLE_END)
+    ]
+    for start, end, tz in travel_periods:
+        carved = []
+        for f, t, offset, name in rows:
+            if t <= start or f >= end:
+                carved.append((f, t, offset, name))
+                continue
+            if f < start:
+                carved.append((f, start, offset, name))
+            if t > end:
+                carved.append((end, t, offset, name))
+        carved.extend((f, t, offset, tz.key) for f, t, offset in zone_segments(tz, start, end))
+        rows = sorted(carved)
+    return rows
+
+
+def create_tz_offsets_table(con, rows):
+    """(Re)create tz_offsets, the lookup table used to localize play timestamps."""
+    con.execute(
+        """
+        CREATE OR REPLACE TABLE tz_offsets (
+            valid_from TIMESTAMP NOT NULL,
+            valid_to TIMESTAMP NOT NULL,
+            utc_offset INTERVAL NOT NULL,
+            timezone TEXT NOT NULL
+        )
+    """
+    )
+    con.executemany(
+        "INSERT INTO tz_offsets VALUES (?, ?, to_seconds(?), ?)",
+        [(f, t, int(offset.total_seconds()), name) for f, t, offset, name in rows],
+    )
+
+
+def iter_json_array(f, read_size=READ_CHUNK_CHARS):
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Only the current element (plus one read buffer) is held in memory,
+    instead of the whole decoded document as with json.load().
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        # Skip whitespace and separators between elements
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            buf = f.read(read_size)
+            pos = 0
+            eof = not buf
+            continue
+
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+
+        if buf[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            item, end = None, None
+
+        # An element that fails to parse, or ends exactly at the buffer
+        # boundary, may be truncated: read more and try again
+        if end is None or (end == len(buf) and not eof):
+            if eof:
+                raise ValueError(f"Malformed JSON element at offset {pos}")
+            more = f.read(read_size)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+
+        yield item
+        pos = end
+
+
+EXPORT_PATTERN = "Streaming_History_Audio_*.json"
+
+
+def export_order(name):
+    """
+    Sort key putting export files in time order. Spotify numbers them with a
+    trailing _N (..._2016-2017_3.json follows ..._2016_2.json), which a plain
+    name sort gets wrong; loading out of order forces a re-sort of play_facts.
+    """
+    match = re.search(r"_(\d+)\.json$", name)
+    return (int(match.group(1)) if match else -1, name)
+
+
+@dataclass(frozen=True)
+class ZipMember:
+    """A streaming history file inside a Spotify export ZIP."""
+
+    archive: Path
+    member: str
+
+    @property
+    def name(self):
+        return Path(self.member).name
+
+
+def find_zip_members(archive):
+    """Streaming history members of an export ZIP, in export order."""
+    with zipfile.ZipFile(archive) as zf:
+        members = [
+            info.filename
+            for info in zf.infolist()
+            if not info.is_dir()
+            and fnmatch.fnmatch(Path(info.filename).name, EXPORT_PATTERN)
+        ]
+    return sorted((ZipMember(Path(archive), m) for m in members), key=lambda z: export_order(z.name))
+
+
+@contextmanager
+def open_export(source):
+    """Open a data_raw/ file or ZipMember as a UTF-8 text stream."""
+    if isinstance(source, ZipMember):
+        # Members are decompressed on the fly; nothing is written to disk
+        with zipfile.ZipFile(source.archive) as zf, zf.open(source.member) as raw:
+            yield io.TextIOWrapper(raw, encoding="utf-8")
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            yield f
+
+
+def describe_export(source):
+    """
+    Return (manifest path, size in bytes, content hash) for an export file.
+
+    ZIP members use the CRC-32 already stored in the archive directory, so
+    checking whether a member changed does not require reading it.
+    """
+    if isinstance(source, ZipMember):
+        with zipfile.ZipFile(source.archive) as zf:
+            info = zf.getinfo(source.member)
+        return (
+            f"{source.archive.resolve()}!{source.member}",
+            info.file_size,
+            f"crc32:{info.CRC:08x}",
+        )
+    return str(source.resolve()), source.stat().st_size, file_sha256(source)
+
+
+def iter_plays(json_file, stats):
+    """
+    Yield (ts, ms_played, track_name, artist_name, album_name,
+    spotify_track_uri) rows from one export file, one play at a time.
+    `ts` is the raw UTC timestamp string; conversion to local time happens
+    in DuckDB against tz_offsets (see insert_plays_sql()).
+    Increments stats["filtered"] for plays below MIN_PLAY_DURATION_MS.
+    """
+    with open_export(json_file) as f:
+        for item in iter_json_array(f):
+            # Skip if missing critical fields
+            if not item.get("ts") or not item.get("master_metadata_track_name"):
+                continue
+
+            # Get play duration
+            ms_played = item.get("ms_played", 0)
+
+            # Skip plays shorter than minimum duration (filter out skips/accidents)
+            if ms_played < MIN_PLAY_DURATION_MS:
+                stats["filtered"] += 1
+                continue
+
+            yield (
+                item["ts"],
+                ms_played,
+                item.get("master_metadata_track_name", "Unknown"),
+                item.get("master_metadata_album_artist_name", "Unknown"),
+                item.get("master_metadata_album_album_name"),
+                item.get("spotify_track_uri"),
+            )
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items from an iterable."""
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size in MB of this process or, if larger, of any
+    finished worker process (0 if unavailable).
+    """
+    if resource is None:
+        return 0.0
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Denormalized play rows, as exposed by the plays view and used for staging
+PLAYS_COLUMNS = """
+    played_at TIMESTAMP NOT NULL,
+    ms_played BIGINT NOT NULL,
+    track_name TEXT NOT NULL,
+    artist_name TEXT NOT NULL,
+    album_name TEXT,
+    spotify_track_uri TEXT,
+    -- Derived columns
+    date DATE,
+    year INTEGER,
+    month INTEGER,
+    year_month VARCHAR,
+    dow INTEGER,
+    dow_name VARCHAR,
+    hour INTEGER
+"""
+
+# Stored play rows: only integer references to track_dim/artist_dim
+PLAY_FACTS_COLUMNS = """
+    played_at TIMESTAMP NOT NULL,
+    ms_played BIGINT NOT NULL,
+    track_id INTEGER NOT NULL,
+    artist_id INTEGER NOT NULL,
+    -- Derived columns
+    date DATE,
+    year INTEGER,
+    month INTEGER,
+    year_month VARCHAR,
+    dow INTEGER,
+    dow_name VARCHAR,
+    hour INTEGER
+"""
+
+# Column layout of the rows yielded by iter_plays()
+CHUNK_SCHEMA = {
+    "ts": ["VARCHAR"],
+    "ms_played": ["BIGINT"],
+    "track_name": ["VARCHAR"],
+    "artist_name": ["VARCHAR"],
+    "album_name": ["VARCHAR"],
+    "spotify_track_uri": ["VARCHAR"],
+}
+
+
+def insert_plays_sql(table, source):
+    """
+    INSERT statement loading plays into `table` from a `source` query that
+    yields the base columns (played_at_utc, ms_played, track_name,
+    artist_name, album_name, spotify_track_uri).
+
+    UTC timestamps are localized with an ASOF join against tz_offsets (one
+    vectorized range lookup instead of a per-row timezone conversion), and
+    derived columns are computed in the same statement, so every row is
+    written exactly once with its final values.
+    """
+    return f"""
+        INSERT INTO {table} (
+            played_at, ms_played, track_name, artist_name,
+            album_name, spotify_track_uri,
+            date, year, month, year_month, dow, dow_name, hour
+        )
+        SELECT
+            played_at, ms_played, track_name, artist_name,
+            album_name, spotify_track_uri,
+            CAST(played_at AS DATE),
+            EXTRACT(YEAR FROM played_at),
+            EXTRACT(MONTH FROM played_at),
+            STRFTIME(played_at, '%Y-%m'),
+            EXTRACT(DOW FROM played_at),
+            CASE EXTRACT(DOW FROM played_at)
+                WHEN 0 THEN 'Sunday'
+                WHEN 1 THEN 'Monday'
+                WHEN 2 THEN 'Tuesday'
+                WHEN 3 THEN 'Wednesday'
+                WHEN 4 THEN 'Thursday'
+                WHEN 5 THEN 'Friday'
+                WHEN 6 THEN 'Saturday'
+            END,
+            EXTRACT(HOUR FROM played_at)
+        FROM (
+            SELECT
+                s.played_at_utc + o.utc_offset AS played_at,
+                s.ms_played, s.track_name, s.artist_name,
+                s.album_name, s.spotify_track_uri
+            FROM ({source}) s
+            ASOF JOIN tz_offsets o ON s.played_at_utc >= o.valid_from
+        )
+    """
+
+
+def file_sha256(path):
+    """Content hash of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_chunks(json_file, stats):
+    """
+    Parse one export file into columnar chunks of up to INSERT_CHUNK_ROWS plays.
+
+    Yields (payload, rows, max_ts) where payload is a JSON document
+    holding one array per CHUNK_SCHEMA column, ready for insert_chunk_sql().
+    """
+    for chunk in chunked(iter_plays(json_file, stats), INSERT_CHUNK_ROWS):
+        payload = json.dumps(dict(zip(CHUNK_SCHEMA, zip(*chunk))))
+        yield payload, len(chunk), max(row[0] for row in chunk)
+
+
+def insert_chunk_sql(table):
+    """
+    INSERT statement for one encode_chunks() payload.
+
+    Each chunk is sent as a single JSON document and unnested server-side:
+    one bulk insert per chunk instead of one execution (and one
+    Python → DuckDB value conversion) per row.
+    """
+    return insert_plays_sql(
+        table,
+        f"""
+        SELECT
+            timezone('UTC', CAST(UNNEST(c.ts) AS TIMESTAMPTZ)) AS played_at_utc,
+            UNNEST(c.ms_played) AS ms_played,
+            UNNEST(c.track_name) AS track_name,
+            UNNEST(c.artist_name) AS artist_name,
+            UNNEST(c.album_name) AS album_name,
+            UNNEST(c.spotify_track_uri) AS spotify_track_uri
+        FROM (SELECT from_json(?, '{json.dumps(CHUNK_SCHEMA)}') AS c)
+    """,
+    )
+
+
+def write_chunks(con, chunks, table):
+    """
+    Insert encode_chunks() payloads into `table`.
+    Returns (rows loaded, latest UTC `ts` among them).
+    """
+    statement = insert_chunk_sql(table)
+    loaded = 0
+    max_ts = None
+    for payload, rows, chunk_max in chunks:
+        con.execute(statement, [payload])
+        loaded += rows
+        max_ts = chunk_max if max_ts is None else max(max_ts, chunk_max)
+    return loaded, max_ts
+
+
+def load_file_python(con, json_file, table, stats):
+    """
+    Stream one export file into `table`.
+    Returns (rows loaded, latest UTC `ts` among them).
+    """
+    # Chunks are written as soon as they are parsed so memory stays flat
+    # regardless of how large the export file is
+    return write_chunks(con, encode_chunks(json_file, stats), table)
+
+
+def parse_file(json_file):
+    """
+    Worker entry point for --workers: parse and encode a whole export file
+    in a separate process. Returns (chunks, filtered plays, parse seconds).
+    """
+    start = time.perf_counter()
+    stats = {"filtered": 0}
+    chunks = list(encode_chunks(json_file, stats))
+    return chunks, stats["filtered"], time.perf_counter() - start
+
+
+def parse_in_order(pool, json_files, window):
+    """
+    Yield parse_file() results for `json_files` in order, with at most
+    `window` files submitted ahead of the one being written, so parsed rows
+    never pile up in this process faster than they are written.
+    """
+    files = iter(json_files)
+    futures = deque(pool.submit(parse_file, json_file) for json_file in islice(files, window))
+    while futures:
+        result = futures.popleft().result()
+        for json_file in islice(files, 1):
+            futures.append(pool.submit(parse_file, json_file))
+        yield result
+
+
+def load_file_sql(con, json_file, table, stats):
+    """
+    Load one export file into `table` with DuckDB's native JSON reader.
+
+    Same filtering as iter_plays(), but done set-based in a single
+    INSERT ... SELECT instead of per record in Python.
+    Returns (rows loaded, latest UTC `ts` among them).
+    """
+    source = f"""
+        read_json(
+            ?,
+            format = 'array',
+            columns = {{
+                ts: 'VARCHAR',
+                ms_played: 'BIGINT',
+                master_metadata_track_name: 'VARCHAR',
+                master_metadata_album_artist_name: 'VARCHAR',
+                master_metadata_album_album_name: 'VARCHAR',
+                spotify_track_uri: 'VARCHAR'
+            }}
+        )
+    """
+    # Same "missing critical fields" rule as the Python engine: NULL or empty
+    valid = """
+        COALESCE(ts, '') <> ''
+        AND COALESCE(master_metadata_track_name, '') <> ''
+    """
+    path = str(json_file)
+
+    played_at_utc = "timezone('UTC', CAST(ts AS TIMESTAMPTZ))"
+
+    loaded = con.execute(
+        insert_plays_sql(
+            table,
+            f"""
+            SELECT
+                {played_at_utc} AS played_at_utc,
+                ms_played,
+                master_metadata_track_name AS track_name,
+                COALESCE(master_metadata_album_artist_name, 'Unknown') AS artist_name,
+                master_metadata_album_album_name AS album_name,
+                spotify_track_uri
+            FROM {source}
+            WHERE {valid}
+              AND COALESCE(ms_played, 0) >= ?
+        """,
+        ),
+        [path, MIN_PLAY_DURATION_MS],
+    ).fetchone()[0]
+
+    # Summary figures for the ingest report and manifest
+    filtered, max_ts = con.execute(
+        f"""
+        SELECT
+            COUNT(*) FILTER (WHERE COALESCE(ms_played, 0) < ?),
+            MAX({played_at_utc}) FILTER (WHERE COALESCE(ms_played, 0) >= ?)
+        FROM {source}
+        WHERE {valid}
+    """,
+        [MIN_PLAY_DURATION_MS, MIN_PLAY_DURATION_MS, path],
+    ).fetchone()
+    stats["filtered"] += filtered
+
+    return loaded, max_ts
+
+
+ENGINES = {
+    "python": load_file_python,
+    "sql": load_file_sql,
+}
+
+
+def validate_engines(con, json_files):
+    """
+    Load every file with both engines into temporary tables and compare
+    them row-for-row (as multisets, including derived columns).
+    Returns True if they are identical.
+    """
+    for name in ENGINES:
+        con.execute(
+            f"CREATE OR REPLACE TEMP TABLE validate_{name} ({PLAYS_COLUMNS})"
+        )
+
+    all_match = True
+    for json_file in json_files:
+        counts = {}
+        for name, load_file in ENGINES.items():
+            con.execute(f"DELETE FROM validate_{name}")
+            stats = {"filtered": 0}
+            rows, _ = load_file(con, json_file, f"validate_{name}", stats)
+            counts[name] = (rows, stats["filtered"])
+
+        only_python, only_sql = con.execute(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM (
+                    SELECT * FROM validate_python
+                    EXCEPT ALL
+                    SELECT * FROM validate_sql
+                )),
+                (SELECT COUNT(*) FROM (
+                    SELECT * FROM validate_sql
+                    EXCEPT ALL
+                    SELECT * FROM validate_python
+                ))
+        """
+        ).fetchone()
+
+        match = only_python == 0 and only_sql == 0 and counts["python"] == counts["sql"]
+        all_match &= match
+        status = "OK" if match else "MISMATCH"
+        print(
+            f"  {status:<8} {json_file.name}: "
+            f"python={counts['python'][0]:,} rows ({counts['python'][1]:,} filtered), "
+            f"sql={counts['sql'][0]:,} rows ({counts['sql'][1]:,} filtered)"
+        )
+        if not match:
+            print(f"           {only_python:,} rows only in python, {only_sql:,} only in sql")
+
+    return all_match
+
+
+def create_play_tables(con):
+    """Create the dictionary-encoded play tables and the plays view."""
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS artist_dim (
+            artist_id INTEGER PRIMARY KEY,
+            artist_name TEXT NOT NULL UNIQUE
+        )
+    """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS track_dim (
+            track_id INTEGER PRIMARY KEY,
+            artist_id INTEGER NOT NULL,
+            track_name TEXT NOT NULL,
+            album_name TEXT,
+            spotify_track_uri TEXT
+        )
+    """
+    )
+    con.execute(f"CREATE TABLE IF NOT EXISTS play_facts ({PLAY_FACTS_COLUMNS})")
+
+    # Compatibility view with the original plays columns, in the original order
+    con.execute(
+        """
+        CREATE OR REPLACE VIEW plays AS
+        SELECT
+            f.played_at,
+            f.ms_played,
+            t.track_name,
+            a.artist_name,
+            t.album_name,
+            t.spotify_track_uri,
+            f.date,
+            f.year,
+            f.month,
+            f.year_month,
+            f.dow,
+            f.dow_name,
+            f.hour
+        FROM play_facts f
+        JOIN track_dim t ON t.track_id = f.track_id
+        JOIN artist_dim a ON a.artist_id = f.artist_id
+    """
+    )
+
+
+def drop_play_tables(con):
+    """Drop the plays view/table (older databases stored plays as a table) and its dimensions."""
+    kind = con.execute(
+        """
+        SELECT 'VIEW' FROM duckdb_views() WHERE view_name = 'plays' AND NOT internal
+        UNION ALL
+        SELECT 'TABLE' FROM duckdb_tables() WHERE table_name = 'plays'
+    """
+    ).fetchone()
+    if kind:
+        con.execute(f"DROP {kind[0]} plays")
+    con.execute("DROP TABLE IF EXISTS play_facts")
+    con.execute("DROP TABLE IF EXISTS track_dim")
+    con.execute("DROP TABLE IF EXISTS artist_dim")
+
+
+def store_plays(con, source):
+    """
+    Dictionary-encode the denormalized plays in `source` and append them to
+    play_facts in played_at order.
+
+    New artists and tracks get the next free integer IDs; a track is one
+    distinct (artist, track_name, album_name, spotify_track_uri) combination.
+    """
+    con.execute(
+        f"""
+        INSERT INTO artist_dim
+        SELECT
+            (SELECT COALESCE(MAX(artist_id), 0) FROM artist_dim)
+                + ROW_NUMBER() OVER (ORDER BY artist_name),
+            artist_name
+        FROM (
+            SELECT DISTINCT artist_name FROM {source}
+            EXCEPT
+            SELECT artist_name FROM artist_dim
+        )
+    """
+    )
+    con.execute(
+        f"""
+        INSERT INTO track_dim
+        SELECT
+            (SELECT COALESCE(MAX(track_id), 0) FROM track_dim)
+                + ROW_NUMBER() OVER (
+                    ORDER BY artist_id, track_name, album_name, spotify_track_uri
+                ),
+            artist_id, track_name, album_name, spotify_track_uri
+        FROM (
+            SELECT DISTINCT a.artist_id, s.track_name, s.album_name, s.spotify_track_uri
+            FROM {source} s
+            JOIN artist_dim a ON a.artist_name = s.artist_name
+            EXCEPT
+            SELECT artist_id, track_name, album_name, spotify_track_uri FROM track_dim
+        )
+    """
+    )
+    con.execute(
+        f"""
+        INSERT INTO play_facts
+        SELECT
+            s.played_at, s.ms_played, t.track_id, t.artist_id,
+            s.date, s.year, s.month, s.year_month, s.dow, s.dow_name, s.hour
+        FROM {source} s
+        JOIN artist_dim a ON a.artist_name = s.artist_name
+        JOIN track_dim t
+          ON t.artist_id = a.artist_id
+         AND t.track_name = s.track_name
+         AND t.album_name IS NOT DISTINCT FROM s.album_name
+         AND t.spotify_track_uri IS NOT DISTINCT FROM s.spotify_track_uri
+        ORDER BY s.played_at
+    """
+    )
+
+
+def migrate_plays_table(con):
+    """
+    Convert a plays table from before dictionary encoding into play_facts,
+    track_dim and artist_dim so --incremental can keep appending to it.
+    Returns True if a migration happened.
+    """
+    def table_exists(name):
+        return con.execute(
+            "SELECT 1 FROM duckdb_tables() WHERE table_name = ?", [name]
+        ).fetchone()
+
+    if table_exists("plays"):
+        # Old indexes would block the rename; they are recreated on play_facts
+        con.execute("DROP INDEX IF EXISTS idx_plays_year_month")
+        con.execute("DROP INDEX IF EXISTS idx_plays_date")
+        con.execute("ALTER TABLE plays RENAME TO plays_legacy")
+
+    # Also resumes a conversion interrupted after the rename
+    if not table_exists("plays_legacy"):
+        return False
+    con.execute("BEGIN TRANSACTION")
+    create_play_tables(con)
+    store_plays(con, "plays_legacy")
+    con.execute("DROP TABLE plays_legacy")
+    con.execute("COMMIT")
+    return True
+
+
+def merge_staging(con):
+    """
+    Append plays from plays_staging that are not already in plays, in
+    played_at order. A play is a duplicate if (played_at, spotify_track_uri,
+    ms_played) matches.
+    Returns (rows appended, earliest and latest played_at appended).
+    """
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE plays_new AS
+        SELECT s.* EXCLUDE (rn)
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY played_at, spotify_track_uri, ms_played
+            ) AS rn
+            FROM plays_staging
+        ) s
+        WHERE s.rn = 1
+          AND NOT EXISTS (
+            SELECT 1
+            FROM plays p
+            WHERE p.played_at = s.played_at
+              AND p.ms_played = s.ms_played
+              AND p.spotify_track_uri IS NOT DISTINCT FROM s.spotify_track_uri
+          )
+        ORDER BY s.played_at
+    """
+    )
+    store_plays(con, "plays_new")
+    return con.execute("SELECT COUNT(*), MIN(played_at), MAX(played_at) FROM plays_new").fetchone()
+
+
+def recluster_plays(con):
+    """
+    Rewrite play_facts in played_at order.
+
+    DuckDB keeps min/max statistics per row group, so when rows are
+    physically sorted by time, date-range filters skip every row group
+    outside the range. Appends that land before existing plays break that
+    ordering; this restores it. Indexes on play_facts are dropped with the
+    old table and must be recreated afterwards.
+    """
+    con.execute("BEGIN TRANSACTION")
+    con.execute(f"CREATE TABLE play_facts_sorted ({PLAY_FACTS_COLUMNS})")
+    con.execute("INSERT INTO play_facts_sorted SELECT * FROM play_facts ORDER BY played_at")
+    con.execute("DROP TABLE play_facts")
+    con.execute("ALTER TABLE play_facts_sorted RENAME TO play_facts")
+    con.execute("COMMIT")
+
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep existing plays, skip already-ingested files and append only new plays",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(ENGINES),
+        default="python",
+        help="How export files are parsed and loaded (default: python)",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Compare python and sql engines row-for-row without modifying plays",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse files in N parallel processes (python engine only)",
+    )
+    parser.add_argument(
+        "--zip",
+        type=Path,
+        metavar="PATH",
+        help="Read Streaming_History_Audio_*.json members straight from a Spotify "
+        "export ZIP (e.g. my_spotify_data.zip) instead of data_raw/",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=DATA_RAW_DIR,
+        metavar="DIR",
+        help="Directory containing the export JSON files (default: data_raw/)",
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=DB_PATH,
+        metavar="PATH",
+        help="DuckDB database to write (default: data/spotify.duckdb)",
+    )
+    parser.add_argument(
+        "--timezones",
+        type=Path,
+        metavar="CSV",
+        help="Travel periods (start,end,timezone) overriding the home timezone "
+        "(default: timezones.csv in the data directory, if present)",
+    )
+    args = parser.parse_args()
+    if args.timezones is None:
+        args.timezones = args.data_dir / TRAVEL_PERIODS_PATH.name
+    load_file = ENGINES[args.engine]
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.engine != "python":
+        parser.error("--workers requires --engine python (the sql engine is already parallel)")
+    if args.zip and (args.engine != "python" or args.validate):
+        parser.error("--zip is only supported by the python engine")
+    if args.zip and not args.zip.is_file():
+        parser.error(f"ZIP file not found: {args.zip}")
+
     # Ensure data directory exists
-    DATA_DIR.mkdir(exist_ok=True)
+    args.db.parent.mkdir(parents=True, exist_ok=True)
 
     # Connect to DuckDB
-    print(f"Connecting to {DB_PATH}")
-    con = duckdb.connect(str(DB_PATH))
+    print(f"Connecting to {args.db}")
+    con = duckdb.connect(str(args.db))
 
-    # Drop existing table if present
-    con.execute("DROP TABLE IF EXISTS plays")
+    if not args.incremental and not args.validate:
+        # Full rebuild: drop existing tables and forget previously ingested files
+        drop_play_tables(con)
+        con.execute("DROP TABLE IF EXISTS ingest_manifest")
+    elif args.incremental and migrate_plays_table(con):
+        print("Converted existing plays table to play_facts/track_dim/artist_dim")
 
-    # Create table with full schema
+    # Create tables with full schema
+    if not args.validate:
+        create_play_tables(con)
+
+    # One row per ingested export file, used to skip unchanged files
     con.execute(
         """
-        CREATE TABLE plays (
-            played_at TIMESTAMP NOT NULL,
-            ms_played BIGINT NOT NULL,
-            track_name TEXT NOT NULL,
-            artist_name TEXT NOT NULL,
-            album_name TEXT,
-            spotify_track_uri TEXT,
-            -- Derived columns
-            date DATE,
-            year INTEGER,
-            month INTEGER,
-            year_month VARCHAR,
-            dow INTEGER,
-            dow_name VARCHAR,
-            hour INTEGER
+        CREATE TABLE IF NOT EXISTS ingest_manifest (
+            path TEXT PRIMARY KEY,
+            size_bytes BIGINT NOT NULL,
+            content_hash TEXT NOT NULL,
+            row_count BIGINT NOT NULL,
+            max_ts TIMESTAMP, -- latest play, raw UTC ts
+            ingested_at TIMESTAMP NOT NULL
         )
     """
     )
@@ -69,7 +970,8 @@ def main():
             track_name TEXT NOT NULL,
             primary_artist_name TEXT NOT NULL,
             album_name TEXT,
-            album_image_url TEXT,
+            spotify_album_id TEXT,
+            album_image_url TEXT, -- legacy per-track album art, read where spotify_album_id is still NULL
             release_date TEXT,
             release_year INTEGER,
             release_decade TEXT,
@@ -95,6 +997,18 @@ def main():
         """
     )
     
+    # Album art is stored once per album; tracks reference it by spotify_album_id
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS albums (
+            spotify_album_id TEXT PRIMARY KEY,
+            album_name TEXT,
+            image_url TEXT,
+            enriched_at TIMESTAMP
+        )
+        """
+    )
+    
     con.execute(
         """
         CREATE TABLE IF NOT EXISTS audio_features (
@@ -128,117 +1042,140 @@ def main():
     )
 
     # Find all streaming history files
-    json_files = sorted(DATA_RAW_DIR.glob("Streaming_History_Audio_*.json"))
+    if args.zip:
+        json_files = find_zip_members(args.zip)
+    else:
+        json_files = sorted(args.data_dir.glob(EXPORT_PATTERN), key=lambda f: export_order(f.name))
 
     if not json_files:
-        print(f"ERROR: No Streaming_History_Audio_*.json files found in {DATA_RAW_DIR}")
-        print("Please place your Spotify export files in data_raw/")
+        print(f"ERROR: No {EXPORT_PATTERN} files found in {args.zip or args.data_dir}")
+        print("Please place your Spotify export files in data_raw/ or pass --zip")
         return
 
     print(f"Found {len(json_files)} file(s) to process")
 
+    # Offset lookup table used by both engines to localize timestamps
+    travel_periods = load_travel_periods(args.timezones)
+    tz_rows = build_tz_offsets(LOCAL_TIMEZONE, travel_periods)
+    create_tz_offsets_table(con, tz_rows)
+    print(f"Timezone table: {len(tz_rows):,} offset periods "
+          f"({len(travel_periods)} travel period(s))")
+
+    if args.validate:
+        print("Validating python engine against sql engine...")
+        ok = validate_engines(con, json_files)
+        con.close()
+        print("Engines match" if ok else "ERROR: Engines produced different rows")
+        sys.exit(0 if ok else 1)
+
+    print(f"Engine: {args.engine}")
+
     total_records = 0
-    filtered_records = 0
+    appended_records = 0
+    skipped_files = 0
+    stats = {"filtered": 0}
+    timings = []
+    reclustered = False
+    latest_played_at = con.execute("SELECT MAX(played_at) FROM plays").fetchone()[0]
 
+    # Decide which files need loading before any parsing starts
+    pending = []
     for json_file in json_files:
+        manifest_path, size_bytes, content_hash = describe_export(json_file)
+
+        if args.incremental:
+            seen = con.execute(
+                "SELECT 1 FROM ingest_manifest WHERE content_hash = ? AND size_bytes = ?",
+                [content_hash, size_bytes],
+            ).fetchone()
+            if seen:
+                skipped_files += 1
+                print(f"Skipping {json_file.name} (unchanged)")
+                continue
+
+        pending.append((json_file, manifest_path, size_bytes, content_hash))
+
+    # With --workers, files are parsed in parallel processes while this
+    # process stays the single writer. Results come back in file order, so
+    # rows are written in the same order as a sequential run.
+    pool = None
+    parsed_files = None
+    if args.workers > 1 and pending:
+        print(f"Parsing with {args.workers} worker processes")
+        pool = ProcessPoolExecutor(max_workers=args.workers)
+        parsed_files = parse_in_order(pool, [json_file for json_file, *_ in pending], args.workers)
+
+    for json_file, manifest_path, size_bytes, content_hash in pending:
         print(f"Processing {json_file.name}...")
+        start = time.perf_counter()
+        parse_seconds = None
 
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        if parsed_files is not None:
+            chunks, filtered, parse_seconds = next(parsed_files)
+            stats["filtered"] += filtered
 
-        # Transform records
-        records = []
-        for item in data:
-            # Skip if missing critical fields
-            if not item.get("ts") or not item.get("master_metadata_track_name"):
-                continue
+        # Rows and manifest entry are committed together so an interrupted
+        # run never records a file whose plays were not stored
+        con.execute("BEGIN TRANSACTION")
+        # Every engine loads one file at a time into a temporary staging table,
+        # so play_facts is only ever appended to in played_at order (see
+        # recluster_plays). It is recreated rather than emptied: rows deleted
+        # from an in-memory temp table keep their memory until it is dropped.
+        con.execute(f"CREATE OR REPLACE TEMP TABLE plays_staging ({PLAYS_COLUMNS})")
 
-            # Get play duration
-            ms_played = item.get("ms_played", 0)
+        if parsed_files is not None:
+            file_records, max_ts = write_chunks(con, chunks, "plays_staging")
+            del chunks
+        else:
+            file_records, max_ts = load_file(con, json_file, "plays_staging", stats)
 
-            # Skip plays shorter than minimum duration (filter out skips/accidents)
-            if ms_played < MIN_PLAY_DURATION_MS:
-                filtered_records += 1
-                continue
+        if args.incremental:
+            appended, earliest, latest = merge_staging(con)
+            print(f"  Appended {appended} new records ({file_records - appended} already present)")
+        else:
+            store_plays(con, "plays_staging")
+            appended, earliest, latest = con.execute(
+                "SELECT COUNT(*), MIN(played_at), MAX(played_at) FROM plays_staging"
+            ).fetchone()
+            print(f"  Inserted {file_records} records")
+        if appended:
+            # A file reaching back before the last day written needs one re-sort
+            # at the end. The hour repeated when clocks fall back can overlap
+            # the previous file, but only within a day, which keeps date (what
+            # the API routes filter on) in order
+            if latest_played_at is not None and earliest.date() < latest_played_at.date():
+                reclustered = True
+            latest_played_at = max(filter(None, [latest_played_at, latest]))
 
-            # Parse timestamp (Spotify provides UTC)
-            ts_string = item["ts"]
-            # Handle both 'Z' and '+00:00' UTC indicators
-            ts_string = ts_string.replace("Z", "+00:00")
-            played_at_utc = datetime.fromisoformat(ts_string)
-
-            # Convert to local timezone (Toronto)
-            played_at_local = played_at_utc.astimezone(LOCAL_TIMEZONE)
-
-            # Store as ISO format string (without timezone suffix for DuckDB)
-            played_at = played_at_local.replace(tzinfo=None).isoformat()
-
-            records.append(
-                {
-                    "played_at": played_at,
-                    "ms_played": ms_played,
-                    "track_name": item.get("master_metadata_track_name", "Unknown"),
-                    "artist_name": item.get(
-                        "master_metadata_album_artist_name", "Unknown"
-                    ),
-                    "album_name": item.get("master_metadata_album_album_name"),
-                    "spotify_track_uri": item.get("spotify_track_uri"),
-                }
+        con.execute(
+            """
+            INSERT OR REPLACE INTO ingest_manifest (
+                path, size_bytes, content_hash, row_count, max_ts, ingested_at
             )
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """,
+            [manifest_path, size_bytes, content_hash, file_records, max_ts],
+        )
+        con.execute("COMMIT")
 
-        # Batch insert
-        if records:
-            con.executemany(
-                """
-                INSERT INTO plays (
-                    played_at, ms_played, track_name, artist_name, 
-                    album_name, spotify_track_uri
-                )
-                VALUES (?, ?, ?, ?, ?, ?)
-            """,
-                [
-                    (
-                        r["played_at"],
-                        r["ms_played"],
-                        r["track_name"],
-                        r["artist_name"],
-                        r["album_name"],
-                        r["spotify_track_uri"],
-                    )
-                    for r in records
-                ],
-            )
+        timings.append((json_file.name, file_records, time.perf_counter() - start, parse_seconds))
+        total_records += file_records
+        appended_records += appended
 
-            total_records += len(records)
-            print(f"  Inserted {len(records)} records")
+    if reclustered:
+        # Plays landed before ones already written; restore time ordering
+        # with one on-disk rewrite (DuckDB's sort spills to disk if needed)
+        print("Re-sorting plays by played_at...")
+        recluster_plays(con)
 
-    # Update derived columns
-    print("Computing derived columns...")
-    con.execute(
-        """
-        UPDATE plays
-        SET 
-            date = CAST(played_at AS DATE),
-            year = EXTRACT(YEAR FROM played_at),
-            month = EXTRACT(MONTH FROM played_at),
-            year_month = STRFTIME(played_at, '%Y-%m'),
-            dow = EXTRACT(DOW FROM played_at),
-            dow_name = CASE EXTRACT(DOW FROM played_at)
-                WHEN 0 THEN 'Sunday'
-                WHEN 1 THEN 'Monday'
-                WHEN 2 THEN 'Tuesday'
-                WHEN 3 THEN 'Wednesday'
-                WHEN 4 THEN 'Thursday'
-                WHEN 5 THEN 'Friday'
-                WHEN 6 THEN 'Saturday'
-            END,
-            hour = EXTRACT(HOUR FROM played_at)
-    """
-    )
+    if pool is not None:
+        pool.shutdown()
+
+    filtered_records = stats["filtered"]
 
     # Create index for performance
-    con.execute("CREATE INDEX idx_plays_year_month ON plays(year_month)")
-    con.execute("CREATE INDEX idx_plays_date ON plays(date)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_plays_year_month ON play_facts(year_month)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_plays_date ON play_facts(date)")
     
     # Create indexes for enrichment tables
     con.execute("CREATE INDEX IF NOT EXISTS idx_tracks_release_year ON tracks(release_year)")
@@ -250,9 +1187,23 @@ def main():
     print("INGESTION COMPLETE")
     print("=" * 60)
     print(f"Timezone: {LOCAL_TIMEZONE} (EST/EDT)")
+    if travel_periods:
+        print(f"Travel periods: {len(travel_periods)} (from {args.timezones})")
     print("All timestamps converted from UTC to local time")
     print(f"Minimum play duration: {MIN_PLAY_DURATION_MS/1000:.0f} seconds")
     print(f"Filtered out: {filtered_records:,} plays (skips/accidents)")
+    print(f"Re-sorted:    {'yes' if reclustered else 'no (files were written in time order)'}")
+    if args.incremental:
+        print(f"Skipped:      {skipped_files:,} unchanged file(s)")
+        print(f"Appended:     {appended_records:,} new plays "
+              f"({total_records - appended_records:,} duplicates ignored)")
+    print(f"Peak memory:  {peak_rss_mb():,.1f} MB (RSS)")
+    if timings:
+        print("-" * 60)
+        print("Per-file timing:")
+        for name, rows, seconds, parse_seconds in timings:
+            detail = f" (parsed in worker: {parse_seconds:.2f}s)" if parse_seconds is not None else ""
+            print(f"  {name:<44} {rows:>9,} rows {seconds:>7.2f}s{detail}")
     print("=" * 60)
 
     summary = con.execute(
@@ -274,10 +1225,14 @@ def main():
     print(f"Unique tracks:    {summary[3]:,}")
     print(f"Unique artists:   {summary[4]:,}")
     print(f"Total hours:      {summary[5]:,}")
+    dims = con.execute(
+        "SELECT (SELECT COUNT(*) FROM track_dim), (SELECT COUNT(*) FROM artist_dim)"
+    ).fetchone()
+    print(f"Dictionary:       {dims[0]:,} track_dim / {dims[1]:,} artist_dim rows")
     print("=" * 60)
 
     con.close()
-    print(f"\nDatabase saved to {DB_PATH}")
+    print(f"\nDatabase saved to {args.db}")
 
 
 if __name__ == "__main__":
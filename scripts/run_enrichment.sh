@@ -49,8 +49,8 @@ import duckdb
 con = duckdb.connect('data/spotify.duckdb')
 tracks = con.execute('SELECT COUNT(*) FROM tracks').fetchone()[0]
 artists = con.execute('SELECT COUNT(*) FROM artists').fetchone()[0]
-total_tracks = con.execute('SELECT COUNT(DISTINCT spotify_track_uri) FROM plays WHERE spotify_track_uri IS NOT NULL').fetchone()[0]
-total_artists = con.execute('SELECT COUNT(DISTINCT artist_name) FROM plays').fetchone()[0]
+total_tracks = con.execute('SELECT COUNT(DISTINCT spotify_track_uri) FROM track_dim').fetchone()[0]
+total_artists = con.execute('SELECT COUNT(*) FROM artist_dim').fetchone()[0]
 print(f'  Tracks:  {tracks:,} / {total_tracks:,}')
 print(f'  Artists: {artists:,} / {total_artists:,}')
 con.close()
@@ -59,7 +59,7 @@ echo ""
 
 # Run enrichment
 echo "🚀 Starting enrichment..."
-echo "⏰ This will take approximately 1-2 hours"
+echo "⏰ This will take approximately 5-15 minutes"
 echo "💡 You can safely cancel (Ctrl+C) and resume later"
 echo ""
 
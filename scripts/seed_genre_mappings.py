@@ -5,28 +5,26 @@ Seed the genre_mappings table with subgenre → broad genre mappings.
 This maps Spotify's 452+ specific genres to 15 broader categories for easier analysis.
 """
 
+import argparse
 import duckdb
 from pathlib import Path
 
 DB_PATH = Path(__file__).parent.parent / "data" / "spotify.duckdb"
 
 
-# Define broad genre categories with pattern-based rules
-def categorize_genre(genre: str) -> tuple[str, str]:
-    """
-    Categorize a genre into a broad category.
-    Returns (broad_genre, confidence) tuple.
-    """
-    g = genre.lower()
-
+# Broad genre rules in priority order: the first rule with one of its
+# keywords in the lowercased genre (and none of its `unless` keywords) wins.
+# Its exceptions are then checked in order, each applying if all of its
+# keywords are present; otherwise the rule's own category is used.
+# Each rule is (broad_genre, confidence, keywords, unless, exceptions).
+GENRE_RULES = [
     # Metal (check first - very specific)
-    if "metal" in g or "deathcore" in g or "djent" in g:
-        return ("Metal", "high")
-
+    ("Metal", "high", ["metal", "deathcore", "djent"], [], []),
     # Rock and subgenres
-    if any(
-        x in g
-        for x in [
+    (
+        "Rock",
+        "high",
+        [
             "rock",
             "grunge",
             "britpop",
@@ -37,14 +35,15 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "jam band",
             "southern gothic",
             "neo-psychedelic",
-        ]
-    ):
-        return ("Rock", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Hip Hop / Rap
-    if any(
-        x in g
-        for x in [
+    (
+        "Hip Hop/Rap",
+        "high",
+        [
             "hip hop",
             "rap",
             "trap",
@@ -54,14 +53,15 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "g-funk",
             "horrorcore",
             "freestyle",
-        ]
-    ):
-        return ("Hip Hop/Rap", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Electronic / Dance
-    if any(
-        x in g
-        for x in [
+    (
+        "Electronic/Dance",
+        "high",
+        [
             "house",
             "techno",
             "trance",
@@ -96,35 +96,25 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "new rave",
             "moombahton",
             "frenchcore",
-        ]
-    ):
+        ],
+        [],
         # Exception: jazz house, jazz fusion house go to Jazz
-        if "jazz" in g and "house" in g:
-            return ("Jazz", "medium")
-        return ("Electronic/Dance", "high")
-
+        [(["jazz", "house"], ("Jazz", "medium"))],
+    ),
     # Jazz
-    if "jazz" in g or "bop" in g:
-        return ("Jazz", "high")
-
+    ("Jazz", "high", ["jazz", "bop"], [], []),
     # Blues
-    if ("blues" in g and "rock" not in g) or "boogie-woogie" in g:
-        return ("Blues", "high")
-
+    ("Blues", "high", ["blues"], ["rock"], []),
+    ("Blues", "high", ["boogie-woogie"], [], []),
     # Soul / R&B
-    if any(
-        x in g for x in ["soul", "r&b", "r & b", "motown", "philly soul", "doo-wop"]
-    ):
-        return ("Soul/R&B", "high")
-
+    ("Soul/R&B", "high", ["soul", "r&b", "r & b", "motown", "philly soul", "doo-wop"], [], []),
     # Funk
-    if "funk" in g and "house" not in g:
-        return ("Funk", "high")
-
+    ("Funk", "high", ["funk"], ["house"], []),
     # Folk / Americana / Singer-Songwriter
-    if any(
-        x in g
-        for x in [
+    (
+        "Folk/Americana",
+        "high",
+        [
             "folk",
             "americana",
             "singer-songwriter",
@@ -136,44 +126,47 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "sea shanties",
             "cajun",
             "zydeco",
-        ]
-    ):
-        return ("Folk/Americana", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Country
-    if "country" in g or "honky tonk" in g or "tejano" in g or "red dirt" in g:
-        return ("Country", "high")
-
+    ("Country", "high", ["country", "honky tonk", "tejano", "red dirt"], [], []),
     # Indie / Alternative
-    if any(
-        x in g for x in ["indie", "alternative", "bedroom", "lo-fi", "lofi", "slowcore"]
-    ):
-        # Exceptions
-        if "folk" in g:
-            return ("Folk/Americana", "high")
-        if "electronic" in g or "house" in g:
-            return ("Electronic/Dance", "high")
-        return ("Indie/Alternative", "high")
-
+    (
+        "Indie/Alternative",
+        "high",
+        ["indie", "alternative", "bedroom", "lo-fi", "lofi", "slowcore"],
+        [],
+        [
+            (["folk"], ("Folk/Americana", "high")),
+            (["electronic"], ("Electronic/Dance", "high")),
+            (["house"], ("Electronic/Dance", "high")),
+        ],
+    ),
     # Pop
-    if "pop" in g or "chanson" in g or "variété" in g or "schlager" in g:
-        # Exceptions for specific pop subgenres
-        if any(
-            x in g for x in ["k-pop", "j-pop", "hyperpop", "synthpop", "electropop"]
-        ):
-            return ("Pop", "high")
-        if "indie" in g:
-            return ("Indie/Alternative", "high")
-        if "folk" in g:
-            return ("Folk/Americana", "high")
-        if "country" in g:
-            return ("Country", "high")
-        return ("Pop", "high")
-
+    (
+        "Pop",
+        "high",
+        ["pop", "chanson", "variété", "schlager"],
+        [],
+        [
+            # Specific pop subgenres stay Pop
+            (["k-pop"], ("Pop", "high")),
+            (["j-pop"], ("Pop", "high")),
+            (["hyperpop"], ("Pop", "high")),
+            (["synthpop"], ("Pop", "high")),
+            (["electropop"], ("Pop", "high")),
+            (["indie"], ("Indie/Alternative", "high")),
+            (["folk"], ("Folk/Americana", "high")),
+            (["country"], ("Country", "high")),
+        ],
+    ),
     # Reggae / Caribbean
-    if any(
-        x in g
-        for x in [
+    (
+        "Reggae/Caribbean",
+        "high",
+        [
             "reggae",
             "ska",
             "dancehall",
@@ -183,14 +176,15 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "calypso",
             "soca",
             "reggaeton",
-        ]
-    ):
-        return ("Reggae/Caribbean", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Latin
-    if any(
-        x in g
-        for x in [
+    (
+        "Latin",
+        "high",
+        [
             "latin",
             "salsa",
             "bachata",
@@ -211,14 +205,15 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "candombe",
             "parang",
             "techengue",
-        ]
-    ):
-        return ("Latin", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Classical / Orchestral
-    if any(
-        x in g
-        for x in [
+    (
+        "Classical",
+        "high",
+        [
             "classical",
             "baroque",
             "opera",
@@ -235,14 +230,15 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "minimalism",
             "early music",
             "ballet",
-        ]
-    ):
-        return ("Classical", "high")
-
+        ],
+        [],
+        [],
+    ),
     # World Music
-    if any(
-        x in g
-        for x in [
+    (
+        "World",
+        "high",
+        [
             "african",
             "afro",
             "celtic",
@@ -294,14 +290,15 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "kayokyoku",
             "shibuya-kei",
             "mizrahi",
-        ]
-    ):
-        return ("World", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Gospel / Christian / Worship
-    if any(
-        x in g
-        for x in [
+    (
+        "Gospel/Christian",
+        "high",
+        [
             "gospel",
             "christian",
             "worship",
@@ -309,56 +306,45 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "catholic",
             "devotional",
             "bhajan",
-        ]
-    ):
-        return ("Gospel/Christian", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Holiday / Seasonal
-    if any(x in g for x in ["christmas", "holiday", "villancicos"]):
-        return ("Holiday", "high")
-
+    ("Holiday", "high", ["christmas", "holiday", "villancicos"], [], []),
     # Punk
-    if ("punk" in g and "funk" not in g) or "riot grrrl" in g or "queercore" in g:
-        return ("Punk", "high")
-
+    ("Punk", "high", ["punk"], ["funk"], []),
+    ("Punk", "high", ["riot grrrl", "queercore"], [], []),
     # Disco
-    if "disco" in g:
-        return ("Disco", "high")
-
+    ("Disco", "high", ["disco"], [], []),
     # Funk (second check for pure funk)
-    if "funk" in g:
-        return ("Funk", "high")
-
+    ("Funk", "high", ["funk"], [], []),
     # Jazz (catch remaining jazz-like genres)
-    if any(x in g for x in ["swing", "big band", "bebop", "ragtime", "brass band"]):
-        return ("Jazz", "medium")
-
+    ("Jazz", "medium", ["swing", "big band", "bebop", "ragtime", "brass band"], [], []),
     # Soundtracks / Instrumental
-    if any(
-        x in g
-        for x in [
+    (
+        "Soundtrack/Score",
+        "high",
+        [
             "soundtrack",
             "score",
             "instrumental",
             "musicals",
             "anime",
             "video game",
-        ]
-    ):
-        return ("Soundtrack/Score", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Spoken Word / Comedy
-    if any(x in g for x in ["spoken word", "comedy", "audiobook", "podcast"]):
-        return ("Spoken Word/Comedy", "high")
-
+    ("Spoken Word/Comedy", "high", ["spoken word", "comedy", "audiobook", "podcast"], [], []),
     # Children's / Lullaby
-    if any(x in g for x in ["children's", "lullaby", "nursery"]):
-        return ("Children's", "high")
-
+    ("Children's", "high", ["children's", "lullaby", "nursery"], [], []),
     # Experimental / Avant-Garde
-    if any(
-        x in g
-        for x in [
+    (
+        "Experimental",
+        "high",
+        [
             "experimental",
             "avant-garde",
             "noise",
@@ -366,14 +352,15 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "musique concrète",
             "plunderphonics",
             "drone",
-        ]
-    ):
-        return ("Experimental", "high")
-
+        ],
+        [],
+        [],
+    ),
     # Easy Listening / Lounge
-    if any(
-        x in g
-        for x in [
+    (
+        "Easy Listening",
+        "medium",
+        [
             "easy listening",
             "lounge",
             "exotica",
@@ -381,25 +368,114 @@ def categorize_genre(genre: str) -> tuple[str, str]:
             "adult standards",
             "quiet storm",
             "smooth",
-        ]
-    ):
-        return ("Easy Listening", "medium")
-
+        ],
+        [],
+        [],
+    ),
     # Emo / Screamo
-    if "emo" in g or "screamo" in g:
-        return ("Emo/Screamo", "high")
-
+    ("Emo/Screamo", "high", ["emo", "screamo"], [], []),
     # New Age
-    if any(x in g for x in ["new age", "meditation", "ambient", "space music"]):
-        return ("New Age", "medium")
+    ("New Age", "medium", ["new age", "meditation", "ambient", "space music"], [], []),
+]
 
-    # If nothing matches, return Other
-    return ("Other", "low")
+# If nothing matches
+DEFAULT_GENRE = ("Other", "low")
+
+
+class GenreClassifier:
+    """
+    GENRE_RULES compiled into one Aho–Corasick automaton over all of their
+    keywords, so a genre is scanned once, whatever the number of rules,
+    instead of once per keyword. The keywords found then select the
+    candidate rules, which are checked in priority order.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        # Rule indexes each keyword can trigger, in priority order
+        self.rules_by_keyword = {}
+        for index, (_, _, keywords, _, _) in enumerate(rules):
+            for keyword in keywords:
+                self.rules_by_keyword.setdefault(keyword, []).append(index)
+        keywords = set(self.rules_by_keyword)
+        for _, _, _, unless, exceptions in rules:
+            keywords.update(unless)
+            for required, _ in exceptions:
+                keywords.update(required)
+
+        # Trie of all keywords: per-state transitions, failure links, and the
+        # keywords ending at each state (including via its failure chain)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [frozenset()]
+        for keyword in sorted(keywords):
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(frozenset())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] = frozenset([keyword])
+
+        # Breadth-first, so each state's failure target is already final
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0) if state else 0
+                self.output[child] |= self.output[self.fail[child]]
+
+    def keywords_in(self, text):
+        """Every rule keyword that occurs in `text` (overlapping matches included)."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+    def classify(self, genre):
+        """(broad_genre, confidence) for a genre."""
+        found = self.keywords_in(genre.lower())
+        candidates = sorted({index for keyword in found for index in self.rules_by_keyword.get(keyword, ())})
+        for index in candidates:
+            broad_genre, confidence, _, unless, exceptions = self.rules[index]
+            if found.intersection(unless):
+                continue
+            for required, result in exceptions:
+                if found.issuperset(required):
+                    return result
+            return (broad_genre, confidence)
+        return DEFAULT_GENRE
+
+
+CLASSIFIER = GenreClassifier(GENRE_RULES)
+
+
+def categorize_genre(genre: str) -> tuple[str, str]:
+    """
+    Categorize a genre into a broad category.
+    Returns (broad_genre, confidence) tuple.
+    """
+    return CLASSIFIER.classify(genre)
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="DuckDB database to seed")
+    args = parser.parse_args()
+
     print("Connecting to database...")
-    con = duckdb.connect(str(DB_PATH))
+    con = duckdb.connect(str(args.db))
 
     # Get all unique genres from the artists table
     print("Fetching all unique genres...")
@@ -481,7 +557,7 @@ def main():
         print(f"{subgenre:<30} → {broad:<25} {conf:<10}")
 
     con.close()
-    print(f"\n✓ Mappings saved to {DB_PATH}")
+    print(f"\n✓ Mappings saved to {args.db}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+"""
+Asynchronous Spotify Web API client used by enrich_metadata.py --async.
+
+spotipy waits for each response before sending the next request, so
+enrichment time is bound by round-trip latency. This client keeps several
+requests in flight on one aiohttp session while a shared token bucket caps
+the overall request rate:
+
+  - at most `concurrency` requests are in flight at once
+  - requests start at no more than `rate` per second (bursts up to `burst`)
+  - a 429 pauses the whole bucket for the Retry-After interval, not just
+    the request that hit it, then that request is retried
+  - 5xx responses and connection errors are retried with exponential backoff
+  - an expired access token (401) is refreshed once and the request retried
+
+Pass an enrichment_metrics.RunMetrics as `metrics` to record every call's
+latency and every attempt's HTTP status.
+
+Base URLs come from SPOTIFY_API_URL / SPOTIFY_TOKEN_URL when set, so the
+client can be pointed at a local stand-in server.
+
+Requires aiohttp (pip install -r requirements.txt).
+"""
+
+import asyncio
+import os
+import time
+
+import aiohttp
+
+SPOTIFY_API_URL = "https://api.spotify.com/v1"
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 10.0  # Requests per second across all in-flight requests
+DEFAULT_BURST = 10
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+DEFAULT_RETRY_AFTER_SECONDS = 5
+
+
+class SpotifyAPIError(Exception):
+    """A request that failed permanently or ran out of retries."""
+
+    def __init__(self, status, url, message=""):
+        super().__init__(f"HTTP {status} for {url}: {message}".rstrip(": "))
+        self.status = status
+        self.url = url
+
+
+def retry_after_seconds(header):
+    """Seconds to wait from a Retry-After header (Spotify sends delta-seconds)."""
+    try:
+        return max(float(header), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECONDS
+
+
+class TokenBucket:
+    """
+    Shared request-rate limiter.
+
+    Holds up to `capacity` tokens, refilled at `rate` per second; each
+    request takes one. pause() blocks every caller until a deadline, which
+    is how a 429 Retry-After is applied to all in-flight work at once.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        # The lock makes waiters queue up in order instead of racing for refills
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncSpotify:
+    """
+    Minimal client-credentials Spotify client for the endpoints enrichment uses.
+
+    Use as an async context manager:
+
+        async with AsyncSpotify(client_id, client_secret) as client:
+            data = await client.tracks(track_ids)
+    """
+
+    def __init__(
+        self,
+        client_id,
+        client_secret,
+        concurrency=DEFAULT_CONCURRENCY,
+        rate=DEFAULT_RATE,
+        burst=DEFAULT_BURST,
+        api_url=None,
+        token_url=None,
+        metrics=None,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = (api_url or os.getenv("SPOTIFY_API_URL") or SPOTIFY_API_URL).rstrip("/")
+        self.token_url = token_url or os.getenv("SPOTIFY_TOKEN_URL") or SPOTIFY_TOKEN_URL
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0}
+        # Optional enrichment_metrics.RunMetrics, fed every attempt and call
+        self.metrics = metrics
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def _access_token(self, refresh=False):
+        async with self._token_lock:
+            # Refresh a minute early so in-flight requests don't race expiry
+            if refresh or not self._token or time.monotonic() > self._token_expires_at - 60:
+                auth = aiohttp.BasicAuth(self.client_id, self.client_secret)
+                async with self.session.post(
+                    self.token_url, data={"grant_type": "client_credentials"}, auth=auth
+                ) as response:
+                    if response.status != 200:
+                        raise SpotifyAPIError(response.status, self.token_url, await response.text())
+                    payload = await response.json()
+                self._token = payload["access_token"]
+                self._token_expires_at = time.monotonic() + payload.get("expires_in", 3600)
+            return self._token
+
+    async def get(self, path, params=None):
+        """GET an API path, returning the decoded JSON body."""
+        async with self.semaphore:
+            # Timed from when a slot is free, so waiting behind other requests isn't counted
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = await self._get(path, params)
+                ok = True
+                return result
+            finally:
+                if self.metrics:
+                    self.metrics.observe_call(path.strip("/").split("/")[0], time.perf_counter() - start, ok)
+
+    def _observe(self, status, retried):
+        if self.metrics:
+            self.metrics.observe_response(status, retried)
+
+    async def _get(self, path, params):
+        url = f"{self.api_url}{path}"
+        refreshed = False
+        for attempt in range(MAX_RETRIES + 1):
+            await self.bucket.acquire()
+            token = await self._access_token()
+            self.stats["requests"] += 1
+            try:
+                async with self.session.get(
+                    url, params=params, headers={"Authorization": f"Bearer {token}"}
+                ) as response:
+                    if response.status == 200:
+                        self._observe(200, retried=False)
+                        return await response.json()
+                    body = await response.text()
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, body, retry_after = None, str(e), None
+
+            retried = (status == 401 and not refreshed) or status == 429 or status is None or status >= 500
+            self._observe(status, retried and attempt < MAX_RETRIES)
+            if status == 401 and not refreshed:
+                await self._access_token(refresh=True)
+                refreshed = True
+            elif status == 429:
+                self.stats["throttled"] += 1
+                self.bucket.pause(retry_after_seconds(retry_after))
+            elif status is None or status >= 500:
+                await asyncio.sleep(BACKOFF_BASE_SECONDS * 2**attempt)
+            else:
+                raise SpotifyAPIError(status, url, body)
+            self.stats["retries"] += 1
+        raise SpotifyAPIError(status, url, f"giving up after {MAX_RETRIES} retries: {body}")
+
+    async def tracks(self, track_ids):
+        """Several tracks (max 50 IDs), same shape as spotipy's sp.tracks()."""
+        return await self.get("/tracks", {"ids": ",".join(track_ids)})
+
+    async def artists(self, artist_ids):
+        """Several artists (max 50 IDs), same shape as spotipy's sp.artists()."""
+        return await self.get("/artists", {"ids": ",".join(artist_ids)})
+
+    async def audio_features(self, track_ids):
+        """Audio features for several tracks (max 100 IDs), same shape as spotipy's sp.audio_features()."""
+        return (await self.get("/audio-features", {"ids": ",".join(track_ids)}))["audio_features"]
@@ -4,6 +4,7 @@ Sync DuckDB data to Vercel Postgres for deployment.
 Run this after ingestion/enrichment before deploying.
 """
 
+import argparse
 import os
 import sys
 import duckdb
@@ -44,6 +45,7 @@ def create_postgres_schema(pg_cur):
     log("  Dropping old tables if they exist...")
     pg_cur.execute("DROP TABLE IF EXISTS genre_mappings CASCADE")
     pg_cur.execute("DROP TABLE IF EXISTS tracks CASCADE")
+    pg_cur.execute("DROP TABLE IF EXISTS albums CASCADE")
     pg_cur.execute("DROP TABLE IF EXISTS artists CASCADE")
     pg_cur.execute("DROP TABLE IF EXISTS plays CASCADE")
     log("  ✓ Old tables dropped")
@@ -86,7 +88,20 @@ def create_postgres_schema(pg_cur):
             explicit BOOLEAN,
             enriched_at TIMESTAMP,
             primary_artist_id VARCHAR,
-            album_image_url VARCHAR
+            spotify_album_id VARCHAR,
+            album_image_url VARCHAR -- legacy per-track album art, read where spotify_album_id is still NULL
+        )
+    """
+    )
+
+    # Create albums table (album art, shared by every track on the album)
+    pg_cur.execute(
+        """
+        CREATE TABLE albums (
+            spotify_album_id VARCHAR PRIMARY KEY,
+            album_name VARCHAR,
+            image_url VARCHAR,
+            enriched_at TIMESTAMP
         )
     """
     )
@@ -147,17 +162,24 @@ def sync_table(duck_con, pg_cur, table_name):
 
     log(f"  Total rows to sync: {total_rows:,}")
 
-    # Get all data from DuckDB
-    log(f"  Fetching data from DuckDB...")
-    result = duck_con.execute(f"SELECT * FROM {table_name}").fetchall()
-    log(f"  ✓ Data fetched ({len(result):,} rows)")
-
-    # Get column names
+    # Get column names, skipping any the Postgres table doesn't have (columns
+    # missing from an older DuckDB database are simply left NULL)
+    pg_cur.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = %s",
+        (table_name,),
+    )
+    pg_columns = {row[0] for row in pg_cur.fetchall()}
     columns = [
         desc[0]
         for desc in duck_con.execute(f"SELECT * FROM {table_name} LIMIT 0").description
+        if desc[0] in pg_columns
     ]
 
+    # Get all data from DuckDB
+    log(f"  Fetching data from DuckDB...")
+    result = duck_con.execute(f"SELECT {', '.join(columns)} FROM {table_name}").fetchall()
+    log(f"  ✓ Data fetched ({len(result):,} rows)")
+
     # Use COPY for bulk loading (much faster!)
     log(f"  Bulk loading into Postgres using COPY...")
 
@@ -193,19 +215,23 @@ def sync_table(duck_con, pg_cur, table_name):
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="DuckDB database to sync from")
+    args = parser.parse_args()
+
     log("=" * 60)
     log("Syncing DuckDB → Vercel Postgres")
     log("=" * 60)
 
-    if not DB_PATH.exists():
-        log(f"\nERROR: DuckDB database not found at {DB_PATH}")
+    if not args.db.exists():
+        log(f"\nERROR: DuckDB database not found at {args.db}")
         log("Please run the ingestion pipeline first:")
         log("  ./scripts/run_pipeline.sh")
         return
 
     # Connect to DuckDB
-    log(f"\nConnecting to DuckDB: {DB_PATH}")
-    duck_con = duckdb.connect(str(DB_PATH), read_only=True)
+    log(f"\nConnecting to DuckDB: {args.db}")
+    duck_con = duckdb.connect(str(args.db), read_only=True)
     log("✓ Connected to DuckDB")
 
     # Connect to Postgres
@@ -231,6 +257,10 @@ def main():
         pg_con.commit()
         log("✓ Tracks committed")
 
+        sync_table(duck_con, pg_cur, "albums")
+        pg_con.commit()
+        log("✓ Albums committed")
+
         sync_table(duck_con, pg_cur, "artists")
         pg_con.commit()
         log("✓ Artists committed")